@@ -0,0 +1,121 @@
+import time
+import tracemalloc
+import numpy as np
+
+class Benchmark:
+
+    @staticmethod
+    def timeIt(function: callable, repeat: int = 3):
+
+        # Best wall time of `repeat` runs, with the result of the last one
+        best, result = None, None
+        for _ in range(repeat):
+            start  = time.perf_counter()
+            result = function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        return best, result
+
+    @staticmethod
+    def syntheticLeakMask(rows: int, cols: int, density: float, seed: int = 0):
+
+        # Random rectangular blobs until `density` of the pixels are leaks (smaller blobs for lower densities)
+        rng   = np.random.default_rng(seed)
+        mask  = np.zeros((rows, cols), dtype=bool)
+        scale = min(density ** 0.5 / 2, 1 / 6)
+        while mask.mean() < density:
+            x, y = rng.integers(0, rows), rng.integers(0, cols)
+            h, w = rng.integers(1, max(2, int(rows * scale))), rng.integers(1, max(2, int(cols * scale)))
+            mask[x:x + h, y:y + w] = True
+
+        return mask
+
+    @staticmethod
+    def measure(function: callable, repeat: int = 10, warmup: int = 1):
+
+        # Latency percentiles and throughput over `repeat` runs, then the peak memory of one traced run
+        for _ in range(warmup):
+            function()
+
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            latencies.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies = np.array(latencies)
+        return {
+            "runs"          : repeat,
+            "ops_per_second": float(repeat / latencies.sum()),
+            "mean"          : float(latencies.mean()),
+            "p50"           : float(np.percentile(latencies, 50)),
+            "p90"           : float(np.percentile(latencies, 90)),
+            "p99"           : float(np.percentile(latencies, 99)),
+            "peak_memory"   : int(peak_memory)
+        }
+
+    @staticmethod
+    def syntheticThermalArray(width: int, height: int, density: float, seed: int = 0, leak_offset: int = 5):
+
+        # Robot thermal array ([x][y], raw values) with hot and cold leaks on `density` of the pixels
+        # The background noise stays within leak_offset of the average (as many hot as cold leak pixels)
+        rng     = np.random.default_rng(seed)
+        noise   = max(leak_offset // 2, 0)
+        thermal = rng.integers(15000 - noise, 15000 + noise + 1, (width, height))
+        leaks   = np.flatnonzero(Benchmark.syntheticLeakMask(width, height, density, seed))
+        hot     = leaks[:len(leaks) // 2]
+        cold    = leaks[len(leaks) // 2:2 * (len(leaks) // 2)]
+        thermal.flat[hot]  += 2000
+        thermal.flat[cold] -= 2000
+
+        return thermal
+
+    @staticmethod
+    def syntheticRgbFrame(width: int, height: int, seed: int = 0):
+
+        # Robot RGB frame ([x][y][rgb]), a noisy gradient
+        rng      = np.random.default_rng(seed)
+        gradient = np.linspace(0, 255, width)[:, None, None] * np.ones((1, height, 3))
+        return np.clip(gradient + rng.normal(0, 12, (width, height, 3)), 0, 255).astype(np.uint8)
+
+class StubYoloResults:
+
+    # Subset of the yolov5 Detections interface used by StructuralIssuesDetector
+    class Frame:
+        def __init__(self, boxes: list):
+            self.shape      = (len(boxes), 7)
+            self.xmin       = [ box[0] for box in boxes ]
+            self.ymin       = [ box[1] for box in boxes ]
+            self.xmax       = [ box[2] for box in boxes ]
+            self.ymax       = [ box[3] for box in boxes ]
+            self.confidence = [ 0.8 for _ in boxes ]
+            self.name       = [ "crack" for _ in boxes ]
+
+    def __init__(self, imgs: list, boxes_nb: int):
+        self.__imgs = imgs
+        self.xyxy   = []
+        for img in imgs:
+            w, h = img.size
+            self.xyxy.append(StubYoloResults.Frame([ (i * w / (boxes_nb + 1), h / 4, (i + 1) * w / (boxes_nb + 1), h / 2) for i in range(boxes_nb) ]))
+
+    def pandas(self):
+        return self
+
+    def render(self):
+        return [ np.array(img.convert('RGB')) for img in self.__imgs ]
+
+class StubYoloModel:
+
+    # Offline stand-in for the yolov5 model: fixed boxes, no inference
+    def __init__(self, boxes_nb: int = 3):
+        self.boxes_nb = boxes_nb
+        self.conf     = 0.4
+
+    def __call__(self, imgs: list):
+        return StubYoloResults(imgs, self.boxes_nb)
@@ -0,0 +1,84 @@
+import argparse
+import cv2
+import numpy as np
+from PIL import Image
+from benchmarks import Benchmark
+from python.images_management import Matrix, RgbImage, ThermalImage, getPilImage
+
+# Reference copies of the former per pixel conversions (on the current matrix layout), kept for comparison
+
+def legacyGetPilImage(mat: list):
+
+    img = Image.new('RGB', [len(mat), len(mat[0])], 255)
+    data = img.load()
+
+    for x in range(img.size[0]):
+        for y in range(img.size[1]):
+            data[x,y] = tuple(mat[x][y])
+
+    return img
+
+def legacyToPilImage(rgb_image: RgbImage):
+
+    matrix = rgb_image.matrix()
+    img = Image.new('RGB', [matrix.rows(), matrix.cols()], 255)
+    data = img.load()
+
+    for x in range(img.size[0]):
+        for y in range(img.size[1]):
+            data[x,y] = matrix.get((x,y))
+
+    return img
+
+def legacyFromPilImage(img: Image):
+
+    new_img = img.convert('RGB')
+    return Matrix.FromPredicate(new_img.size[1], new_img.size[0], lambda c: new_img.getpixel((c[1], c[0])))
+
+def legacyToRgbImage(thermal_image: ThermalImage):
+
+    matrix      = thermal_image.matrix()
+    np_old_img  = np.array(matrix.array())
+    np_new_arr  = np.zeros((matrix.rows(), matrix.cols()), dtype=np.uint8)
+    np_new_img  = np.uint8(cv2.normalize(np_old_img, np_new_arr, 0, 255, cv2.NORM_MINMAX))
+    colored_img = cv2.applyColorMap(np_new_img, cv2.COLORMAP_MAGMA).tolist()
+
+    return Matrix.FromPredicate(len(colored_img), len(colored_img[0]), lambda c: tuple(colored_img[c[0]][c[1]]))
+
+def run(sizes: list, repeat: int):
+
+    print("{:>12} {:>28} {:>12} {:>12} {:>10} {:>8}".format("size", "conversion", "legacy (ms)", "buffer (ms)", "speedup", "same"))
+
+    for width, height in sizes:
+
+        frame       = Benchmark.syntheticRgbFrame(width, height)
+        pil_img     = getPilImage(frame)
+        rgb_image   = RgbImage.FromPixelMatrix(Matrix.FromArray(frame), copy=False)
+        _, thermal  = ThermalImage.FromThermalArray(Benchmark.syntheticThermalArray(width, height, 0.05))
+
+        cases = [
+            ("getPilImage",             lambda: legacyGetPilImage(frame.tolist()),  lambda: getPilImage(frame),
+                lambda legacy, new: np.array_equal(np.asarray(legacy), np.asarray(new))),
+            ("RgbImage.toPilImage",     lambda: legacyToPilImage(rgb_image),        lambda: rgb_image.toPilImage(),
+                lambda legacy, new: np.array_equal(np.asarray(legacy), np.asarray(new))),
+            ("RgbImage.fromPilImage",   lambda: legacyFromPilImage(pil_img),        lambda: RgbImage.fromPilImage(pil_img),
+                lambda legacy, new: np.array_equal(legacy.array(), new.matrix().array())),
+            ("ThermalImage.toRgbImage", lambda: legacyToRgbImage(thermal),          lambda: thermal.toRgbImage(),
+                lambda legacy, new: np.array_equal(legacy.array(), new.matrix().array())),
+        ]
+
+        for name, legacy_function, new_function, same_function in cases:
+            legacy_time, legacy_result = Benchmark.timeIt(legacy_function, 1)
+            new_time, new_result       = Benchmark.timeIt(new_function, repeat)
+            print("{:>12} {:>28} {:>12.2f} {:>12.2f} {:>9.0f}x {:>8}".format(
+                "{}x{}".format(width, height), name, legacy_time * 1000, new_time * 1000, legacy_time / new_time, str(same_function(legacy_result, new_result))
+            ))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare the per pixel and buffer based image conversions")
+    parser.add_argument("--sizes", nargs="+", default=["250x200", "640x480", "1280x720"])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    run([ tuple(int(v) for v in size.split("x")) for size in args.sizes ], args.repeat)
@@ -0,0 +1,52 @@
+import argparse
+import numpy as np
+from PIL import Image
+from benchmarks import Benchmark
+from python.images_management import EncodingPolicy
+from python.thermal_issues import ThermalIssuesDetector
+
+# Encoding policies compared on the artifacts of one wall cell
+POLICIES = {
+    "png (level 6, former)" : EncodingPolicy("PNG"),
+    "png (level 1)"         : EncodingPolicy.Png(compress_level=1),
+    "png (level 0)"         : EncodingPolicy.Png(compress_level=0),
+    "webp (lossless)"       : EncodingPolicy.LosslessWebp(method=0),
+    "jpeg (quality 90)"     : EncodingPolicy.Jpeg(quality=90),
+}
+
+def syntheticCell(normal_size: tuple, seed: int = 0):
+
+    # Smooth noisy RGB frame (close to a photo) and a thermal grid with a warm blob
+    rng = np.random.default_rng(seed)
+    w, h = normal_size
+    gradient = np.linspace(0, 255, w)[None, :, None] * np.ones((h, 1, 3))
+    normal = np.clip(gradient + rng.normal(0, 12, (h, w, 3)), 0, 255).astype(np.uint8)
+
+    thermal = rng.integers(15000, 15200, (250, 200))
+    thermal[100:140, 80:120] += 400
+
+    return Image.fromarray(normal), thermal
+
+def run(normal_size: tuple, repeat: int):
+
+    normal_img, thermal_arr = syntheticCell(normal_size)
+    thermal_initial_img, thermal_result_img, _ = ThermalIssuesDetector().detectFromArray(thermal_arr)
+    cell_images = [ normal_img, normal_img, thermal_initial_img, thermal_result_img ]
+
+    print("{:>24} {:>14} {:>14}".format("policy", "ms / cell", "KiB / cell"))
+    for name, policy in POLICIES.items():
+        elapsed, sizes = Benchmark.timeIt(lambda: [ len(policy.encode(img)) for img in cell_images ], repeat)
+        print("{:>24} {:>14.1f} {:>14.1f}".format(name, elapsed * 1000, sum(sizes) / 1024))
+
+    npy_policy = EncodingPolicy.Npy()
+    elapsed, content = Benchmark.timeIt(lambda: npy_policy.encode(thermal_arr), repeat)
+    print("{:>24} {:>14.1f} {:>14.1f}".format("thermal grid (npz)", elapsed * 1000, len(content) / 1024))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare the encoding time and size of the stored artifacts of a wall cell")
+    parser.add_argument("--normal-size", default="1280x720")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run(tuple(int(v) for v in args.normal_size.split("x")), args.repeat)
@@ -0,0 +1,81 @@
+import argparse
+from benchmarks import Benchmark
+from python.images_management import ConnectedComponents, LeakMask
+
+# Reference copy of the former LeakMask.__makeGroups, kept for comparison
+def legacyMakeGroups(data: list, start_group_id):
+
+    pixels_nb_categ     = 0
+    pixels_nb_to_categ  = len(data)
+    pixels_data         = { LeakMask.tuple2ToStr(data[i]) : { "group": None, "index": i } for i in range(len(data)) }
+
+    group_id = start_group_id
+
+    while pixels_nb_to_categ != pixels_nb_categ:
+
+        start_pos = next(pixel_data["index"] for pixel_data in pixels_data.values() if pixel_data["group"] is None)
+        all_pos_to_check = [ start_pos ]
+
+        while len(all_pos_to_check) != 0:
+
+            pos_to_check    = all_pos_to_check.pop()
+            pixel_to_check  = data[pos_to_check]
+            str_to_check    = LeakMask.tuple2ToStr(pixel_to_check)
+
+            if pixels_data[str_to_check]["group"] is None:
+
+                pixels_data[str_to_check]["group"] = group_id
+                pixels_nb_categ += 1
+
+                x,y = pixel_to_check
+                for t in range(1, 10):
+                    for o_x, o_y in [ (0,1),(0,-1),(1,0),(-1,0),(1,1),(-1,-1),(1,-1),(-1,1) ]:
+
+                        newt_str_to_check = LeakMask.tuple2ToStr((x + o_x * t, y + o_y * t))
+                        if newt_str_to_check in pixels_data:
+
+                            next_pos_to_check = pixels_data[newt_str_to_check]["index"]
+                            if not(next_pos_to_check in all_pos_to_check) and pixels_data[newt_str_to_check]["group"] is None:
+                                all_pos_to_check.append(next_pos_to_check)
+
+        group_id += 1
+
+    result = {}
+    for pixel_str, pixel_data in pixels_data.items():
+        result.setdefault(pixel_data["group"], []).append(LeakMask.tuple2FromStr(pixel_str))
+
+    return result
+
+def run(sizes: list, densities: list, repeat: int, skip_legacy: bool):
+
+    print("{:>10} {:>8} {:>8} {:>8} {:>12} {:>12} {:>8}".format("size", "density", "pixels", "groups", "legacy (s)", "labels (s)", "same"))
+
+    for rows, cols in sizes:
+        for density in densities:
+
+            mask   = Benchmark.syntheticLeakMask(rows, cols, density)
+            coords = [ (int(x), int(y)) for x, y in zip(*mask.nonzero()) ]
+
+            new_time, components = Benchmark.timeIt(lambda: ConnectedComponents.FromMask(mask, LeakMask.reach), repeat)
+            new_groups = components.groups()
+
+            if skip_legacy:
+                legacy_time, same = float("nan"), "-"
+            else:
+                legacy_time, legacy_groups = Benchmark.timeIt(lambda: legacyMakeGroups(coords, 0), 1)
+                same = list(legacy_groups.values()) == new_groups
+
+            print("{:>10} {:>8.2f} {:>8} {:>8} {:>12.4f} {:>12.4f} {:>8}".format(
+                "{}x{}".format(rows, cols), density, len(coords), len(new_groups), legacy_time, new_time, str(same)
+            ))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare leak grouping implementations on synthetic leak masks")
+    parser.add_argument("--sizes", nargs="+", default=["50x40", "125x100", "250x200"])
+    parser.add_argument("--densities", nargs="+", type=float, default=[0.01, 0.05, 0.2])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    run([ tuple(int(v) for v in size.split("x")) for size in args.sizes ], args.densities, args.repeat, args.skip_legacy)
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+from benchmarks import Benchmark, StubYoloModel
+from python.images_management import ThermalImage, LeakMask, getPilImage
+from python.structural_issues import StructuralIssuesDetector
+
+REPO_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def benchmarkThermal(results: dict, thermal_size: tuple, density: float, repeat: int):
+
+    thermal_arr = Benchmark.syntheticThermalArray(thermal_size[0], thermal_size[1], density)
+    view, data  = ThermalImage.FromThermalArray(thermal_arr)
+    average, _, _ = data.getTemperatureInfo()
+    relative    = data.toRelativeThermalImage(average)
+
+    results["ThermalImage.FromThermalArray"] = Benchmark.measure(lambda: ThermalImage.FromThermalArray(thermal_arr), repeat)
+    results["ThermalImage.getTemperatureInfo"] = Benchmark.measure(lambda: data.getTemperatureInfo(), repeat)
+    results["ThermalImage.toRelativeThermalImage"] = Benchmark.measure(lambda: data.toRelativeThermalImage(average), repeat)
+    results["LeakMask.FromData"] = Benchmark.measure(lambda: LeakMask.FromData(view, relative, 5), repeat)
+
+def benchmarkStructural(results: dict, normal_size: tuple, batch_size: int, repeat: int):
+
+    frames   = [ Benchmark.syntheticRgbFrame(normal_size[0], normal_size[1], seed) for seed in range(batch_size) ]
+    detector = StructuralIssuesDetector(None, batch_size, model=StubYoloModel())
+
+    results["getPilImage"] = Benchmark.measure(lambda: getPilImage(frames[0]), repeat)
+    results["StructuralIssuesDetector.detectFromArrays (stub model, batch of {})".format(batch_size)] = Benchmark.measure(lambda: detector.detectFromArrays(frames), repeat)
+
+def benchmarkStorage(results: dict, normal_size: tuple, thermal_size: tuple, density: float, tree_sizes: list, repeat: int):
+
+    # The server module works on relative folders, it is imported from an empty working directory
+    sys.path.insert(0, REPO_FOLDER)
+    working_folder = tempfile.mkdtemp(prefix="eps3-benchmark-")
+    os.chdir(working_folder)
+    import main
+    main.STRUCTURAL_ISSUES_DETECTOR = StructuralIssuesDetector(None, main.STRUCTURAL_ISSUES_BATCH_SIZE, model=StubYoloModel())
+
+    normal_arr  = Benchmark.syntheticRgbFrame(normal_size[0], normal_size[1])
+    thermal_arr = Benchmark.syntheticThermalArray(thermal_size[0], thermal_size[1], density)
+
+    for tree_size in tree_sizes:
+
+        # One building per tree size, each call stores the next wall cell
+        building_name = "Benchmark{}".format(tree_size)
+        columns_nb    = max(1, int(tree_size ** 0.5))
+        cells         = iter(range(tree_size))
+        last_analysis = {}
+
+        def uploadNextCell():
+            index = next(cells)
+            last_analysis.update(main.uploadReportFiles({ "building_name": building_name, "row": index // columns_nb, "column": index % columns_nb }, normal_arr, thermal_arr))
+
+        results["uploadReportFiles ({} cells)".format(tree_size)] = Benchmark.measure(uploadNextCell, max(1, tree_size - 2))
+
+        day = last_analysis["metadata"]["day"]
+        def getUncachedAnalysis():
+            main.REPORT_CACHE.clear()
+            return main.getCompleteAnalysis(building_name, day)
+
+        results["getCompleteAnalysis ({} cells, uncached)".format(tree_size)] = Benchmark.measure(getUncachedAnalysis, repeat)
+        results["getCompleteAnalysis ({} cells, cached)".format(tree_size)]   = Benchmark.measure(lambda: main.getCompleteAnalysis(building_name, day), repeat)
+
+    os.chdir(REPO_FOLDER)
+    shutil.rmtree(working_folder, ignore_errors=True)
+
+def show(results: dict, baseline: dict = None):
+
+    print("{:<72} {:>10} {:>10} {:>10} {:>10} {:>11}{}".format("benchmark", "ops/s", "p50 (ms)", "p90 (ms)", "p99 (ms)", "peak (KiB)", "  vs baseline" if baseline else ""))
+    for name, result in results.items():
+        comparison = ""
+        if baseline and name in baseline:
+            comparison = "  {:>8.2f}x".format(baseline[name]["p50"] / result["p50"])
+        print("{:<72} {:>10.1f} {:>10.2f} {:>10.2f} {:>10.2f} {:>11.1f}{}".format(
+            name, result["ops_per_second"], result["p50"] * 1000, result["p90"] * 1000, result["p99"] * 1000, result["peak_memory"] / 1024, comparison
+        ))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Benchmark the detection and storage pipeline on synthetic data")
+    parser.add_argument("--thermal-size", default="250x200")
+    parser.add_argument("--normal-size", default="1280x720")
+    parser.add_argument("--density", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--tree-sizes", nargs="+", type=int, default=[4, 16, 64])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--skip-storage", action="store_true")
+    parser.add_argument("--output", default=None, help="save the results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results of a previous run to compare with (p50 speedup)")
+    args = parser.parse_args()
+
+    thermal_size = tuple(int(v) for v in args.thermal_size.split("x"))
+    normal_size  = tuple(int(v) for v in args.normal_size.split("x"))
+
+    results = {}
+    benchmarkThermal(results, thermal_size, args.density, args.repeat)
+    benchmarkStructural(results, normal_size, args.batch_size, args.repeat)
+    if not args.skip_storage:
+        benchmarkStorage(results, normal_size, thermal_size, args.density, args.tree_sizes, args.repeat)
+
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["results"]
+    show(results, baseline)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({ "config": vars(args), "results": results }, f, indent=4)
@@ -0,0 +1,138 @@
+import argparse
+import glob
+import json
+import os
+import resource
+import time
+import numpy as np
+from PIL import Image
+from python.structural_issues import StructuralIssuesDetector
+
+def residentMemory():
+
+    # Current resident memory in bytes (Linux), the peak one elsewhere
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def findImages(storage_folder: str, limit: int = None):
+
+    # Normal initial images of the stored cells, read from their result files (the images can be blobs named after their content)
+    paths = []
+    for result_data_path in sorted(glob.glob(os.path.join(storage_folder, "**", "result-data.json"), recursive=True)):
+        with open(result_data_path, "r") as f:
+            image_path = json.load(f).get("images", {}).get("normal", {}).get("initial")
+        if image_path is not None and os.path.exists(image_path):
+            paths.append(image_path)
+
+    return paths[:limit] if limit is not None else paths
+
+def boxIou(a: dict, b: dict):
+    inter_w = max(0.0, min(a["xmax"], b["xmax"]) - max(a["xmin"], b["xmin"]))
+    inter_h = max(0.0, min(a["ymax"], b["ymax"]) - max(a["ymin"], b["ymin"]))
+    inter   = inter_w * inter_h
+    union   = (a["xmax"] - a["xmin"]) * (a["ymax"] - a["ymin"]) + (b["xmax"] - b["xmin"]) * (b["ymax"] - b["ymin"]) - inter
+    return inter / union if union > 0 else 0.0
+
+def compareDetections(reference: list, candidate: list, iou_threshold: float):
+
+    # Each reference box is matched with its best overlapping candidate box (greedy, best IoU first)
+    pairs = sorted(
+        ((boxIou(ref["box"], can["box"]), i, j) for i, ref in enumerate(reference) for j, can in enumerate(candidate)),
+        reverse=True
+    )
+    matched_ref, matched_can, ious, same_class = set(), set(), [], 0
+    for iou, i, j in pairs:
+        if iou < iou_threshold:
+            break
+        if i in matched_ref or j in matched_can:
+            continue
+        matched_ref.add(i)
+        matched_can.add(j)
+        ious.append(iou)
+        same_class += reference[i]["class"] == candidate[j]["class"]
+
+    return {
+        "reference_boxes": len(reference),
+        "candidate_boxes": len(candidate),
+        "matched"        : len(ious),
+        "iou_sum"        : float(sum(ious)),
+        "same_class"     : same_class
+    }
+
+def runBackend(backend: str, weights: str, repo_path: str, images_paths: list, batch_size: int):
+
+    memory_before = residentMemory()
+    detector = StructuralIssuesDetector(weights, batch_size, repo_path=repo_path, backend=backend)
+    memory_loaded = residentMemory()
+
+    # One warm-up batch, then the timed batches
+    first_batch = [ Image.open(path).convert("RGB") for path in images_paths[:batch_size] ]
+    detector.detectFromImages(first_batch, render=False)
+
+    latencies, predictions, total_time = [], [], 0.0
+    for start in range(0, len(images_paths), batch_size):
+        imgs = [ Image.open(path).convert("RGB") for path in images_paths[start:start + batch_size] ]
+        batch_start = time.perf_counter()
+        detections = detector.detectFromImages(imgs, render=False)
+        batch_time = time.perf_counter() - batch_start
+        total_time += batch_time
+        latencies.append(batch_time / len(imgs))
+        predictions += [ detection[2] for detection in detections ]
+
+    return {
+        "backend"       : backend,
+        "loading_time"  : detector.loading_time,
+        "model_memory"  : memory_loaded - memory_before,
+        "memory"        : residentMemory(),
+        "latency_p50"   : float(np.percentile(latencies, 50)),
+        "latency_p90"   : float(np.percentile(latencies, 90)),
+        "images_per_s"  : len(images_paths) / total_time
+    }, predictions
+
+def run(storage_folder: str, weights: str, repo_path: str, limit: int, batch_size: int, iou_threshold: float):
+
+    images_paths = findImages(storage_folder, limit)
+    if len(images_paths) == 0:
+        print(" > No stored normal initial image found in {}".format(storage_folder))
+        return
+
+    # Latency is per image (batch time / batch size), both backends run in this process one after the other
+    print(" > {} images".format(len(images_paths)))
+    reference_stats, reference_predictions = runBackend("pytorch", weights, repo_path, images_paths, batch_size)
+    candidate_stats, candidate_predictions = runBackend("int8",    weights, repo_path, images_paths, batch_size)
+
+    print("{:>10} {:>12} {:>14} {:>14} {:>12} {:>12} {:>12}".format("backend", "loading (s)", "model (MiB)", "RSS (MiB)", "p50 (ms)", "p90 (ms)", "images/s"))
+    for stats in [ reference_stats, candidate_stats ]:
+        print("{:>10} {:>12.2f} {:>14.1f} {:>14.1f} {:>12.1f} {:>12.1f} {:>12.2f}".format(
+            stats["backend"], stats["loading_time"], stats["model_memory"] / 2 ** 20, stats["memory"] / 2 ** 20,
+            stats["latency_p50"] * 1000, stats["latency_p90"] * 1000, stats["images_per_s"]
+        ))
+
+    # Detection agreement of the INT8 backend with the full precision one
+    totals = { "reference_boxes": 0, "candidate_boxes": 0, "matched": 0, "iou_sum": 0.0, "same_class": 0 }
+    for reference, candidate in zip(reference_predictions, candidate_predictions):
+        for key, value in compareDetections(reference, candidate, iou_threshold).items():
+            totals[key] += value
+
+    print(" > Boxes: {} pytorch, {} int8, {} matched at IoU >= {} ({:.1%} of the pytorch boxes)".format(
+        totals["reference_boxes"], totals["candidate_boxes"], totals["matched"], iou_threshold, totals["matched"] / max(totals["reference_boxes"], 1)
+    ))
+    print(" > Matched boxes: mean IoU {:.3f}, same class {:.1%}".format(
+        totals["iou_sum"] / max(totals["matched"], 1), totals["same_class"] / max(totals["matched"], 1)
+    ))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare the full precision and INT8 structural issues backends on stored normal initial images")
+    parser.add_argument("--storage", default="static/storage")
+    parser.add_argument("--weights", default="assets/weights/best_weights.pt")
+    parser.add_argument("--repo", default=None, help="vendored yolov5 repository (offline loading)")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--iou", type=float, default=0.5)
+    args = parser.parse_args()
+
+    run(args.storage, args.weights, args.repo, args.limit, args.batch_size, args.iou)
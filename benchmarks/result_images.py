@@ -0,0 +1,71 @@
+import argparse
+import os
+import tempfile
+from benchmarks import Benchmark
+from benchmarks.image_encoding import syntheticCell
+from python.images_management import EncodingPolicy, drawPredictions, saveThumbnail
+from python.mosaic_management import WallMosaic
+from python.thermal_issues import ThermalIssuesDetector
+
+# Boxes standing for the structural model predictions (the model itself is not run)
+def syntheticPredictions(normal_size: tuple, boxes_nb: int):
+    w, h = normal_size
+    return [
+        {
+            "confidence": 80,
+            "class": "crack",
+            "box": { "xmin": float(i * w // (boxes_nb + 1)), "ymin": float(h // 4), "xmax": float((i + 1) * w // (boxes_nb + 1)), "ymax": float(h // 2) }
+        }
+        for i in range(boxes_nb)
+    ]
+
+def storeCell(folder: str, normal_img, thermal_arr, predictions: list, result_images: bool):
+
+    # Same artifacts as uploadReportFiles (mosaic included), returns the stored bytes
+    # The thermal overlay is made in both modes: it is the thermal result layer of the mosaic
+    policy = EncodingPolicy.Png(compress_level=1)
+    thermal_initial_img, thermal_result_img, _ = ThermalIssuesDetector().detectFromArray(thermal_arr)
+
+    images = { "normal-initial-image": normal_img, "thermal-initial-image": thermal_initial_img }
+    mosaic_images = { "normal-initial": normal_img, "thermal-initial": thermal_initial_img, "thermal-result": thermal_result_img }
+    mosaic_predictions = {}
+    if result_images:
+        images["normal-result-image"]  = drawPredictions(normal_img, predictions)
+        images["thermal-result-image"] = thermal_result_img
+        mosaic_images["normal-result"] = images["normal-result-image"]
+    else:
+        mosaic_predictions["normal-result"] = ("normal-initial", predictions)
+    WallMosaic(os.path.join(folder, "mosaics"), "Benchmark", "20230101").addCell(0, 0, mosaic_images, mosaic_predictions)
+
+    paths = [ EncodingPolicy.Npy().save(thermal_arr, folder, "thermal-array") ]
+    for file_name, img in images.items():
+        paths += [ policy.save(img, folder, file_name), saveThumbnail(img, folder, file_name) ]
+
+    return sum(os.path.getsize(path) for path in paths)
+
+def run(normal_size: tuple, boxes_nb: int, repeat: int):
+
+    normal_img, thermal_arr = syntheticCell(normal_size)
+    predictions = syntheticPredictions(normal_size, boxes_nb)
+
+    print("{:>26} {:>14} {:>14}".format("mode", "ms / cell", "KiB / cell"))
+    for name, result_images in [ ("result images stored", True), ("annotations only", False) ]:
+        with tempfile.TemporaryDirectory() as folder:
+            elapsed, size = Benchmark.timeIt(lambda: storeCell(folder, normal_img, thermal_arr, predictions, result_images), repeat)
+        print("{:>26} {:>14.1f} {:>14.1f}".format(name, elapsed * 1000, size / 1024))
+
+    # Cost paid on demand instead, when a result image is viewed (before the render cache)
+    elapsed, content = Benchmark.timeIt(lambda: EncodingPolicy.Png(compress_level=1).encode(drawPredictions(normal_img, predictions)), repeat)
+    print("{:>26} {:>14.1f} {:>14.1f}".format("on demand normal render", elapsed * 1000, len(content) / 1024))
+    elapsed, content = Benchmark.timeIt(lambda: EncodingPolicy.Png(compress_level=1).encode(ThermalIssuesDetector().detectFromArray(thermal_arr)[1]), repeat)
+    print("{:>26} {:>14.1f} {:>14.1f}".format("on demand thermal render", elapsed * 1000, len(content) / 1024))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare the per cell storage cost with and without stored result images")
+    parser.add_argument("--normal-size", default="1280x720")
+    parser.add_argument("--boxes", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run(tuple(int(v) for v in args.normal_size.split("x")), args.boxes, args.repeat)
@@ -0,0 +1,34 @@
+import argparse
+from benchmarks import Benchmark, StubYoloModel
+from python.images_management import getPilImage
+from python.structural_issues import StructuralIssuesDetector
+
+def run(sizes: list, tile_size: int, tile_overlap: int, weights: str, repeat: int):
+
+    # The real model when weights are given (needs torch), a stub model otherwise (tiling and merging overhead only)
+    model = None if weights is not None else StubYoloModel()
+    whole = StructuralIssuesDetector(weights, model=model)
+    tiled = StructuralIssuesDetector(weights, model=model, tile_size=tile_size, tile_overlap=tile_overlap)
+
+    print("{:>12} {:>8} {:>14} {:>14} {:>12} {:>12}".format("frame", "tiles", "whole (ms)", "tiled (ms)", "whole boxes", "tiled boxes"))
+    for width, height in sizes:
+        frame = getPilImage(Benchmark.syntheticRgbFrame(width, height))
+
+        whole_time, (_, _, whole_predictions) = Benchmark.timeIt(lambda: whole.detectFromImage(frame, render=False), repeat)
+        tiled_time, (_, _, tiled_predictions) = Benchmark.timeIt(lambda: tiled.detectFromImage(frame, render=False), repeat)
+        print("{:>12} {:>8} {:>14.1f} {:>14.1f} {:>12} {:>12}".format(
+            "{}x{}".format(width, height), len(StructuralIssuesDetector.tileOrigins(frame.size, tile_size, tile_overlap)),
+            whole_time * 1000, tiled_time * 1000, len(whole_predictions), len(tiled_predictions)
+        ))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Compare whole frame and tiled structural issues inference latency by frame size")
+    parser.add_argument("--sizes", nargs="+", default=["640x480", "1280x720", "1920x1080", "3840x2160"])
+    parser.add_argument("--tile-size", type=int, default=640)
+    parser.add_argument("--tile-overlap", type=int, default=128)
+    parser.add_argument("--weights", default=None, help="model weights (.pt), a stub model is used without them")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    run([ tuple(int(v) for v in size.split("x")) for size in args.sizes ], args.tile_size, args.tile_overlap, args.weights, args.repeat)
@@ -1,10 +1,26 @@
-from flask import Flask, url_for, request, render_template
+from flask import Flask, url_for, request, render_template, jsonify, Response, stream_with_context, send_file, abort, g
 from python.structural_issues import StructuralIssuesDetector
 from python.thermal_issues import ThermalIssuesDetector, RgbImage
+from python.images_management import getPilImage, saveThumbnail, drawPredictions, getTemperatureDifferenceImage, EncodingPolicy
 from python.file_management import FileManagement
+from python.jobs_management import Job, JobQueue, JobQueueFullException, JobTooLargeException
+from python.upload_management import UploadDecoder
+from python.index_management import ReportIndex
+from python.cache_management import LruCache
+from python.mosaic_management import WallMosaic
+from python.reanalysis_management import Reanalysis, ReanalysisRunningException
+from python.metrics_management import Metrics
+from python.blob_management import BlobStore
+from python.series_management import ThermalSeriesStore
 from PIL import Image
 from datetime import datetime
-from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, Future
+import multiprocessing
+import cProfile
+import random
+import time
+import io
+import numpy as np
 import os
 from collections import Counter
 import json
@@ -15,41 +31,211 @@ ssl._create_default_https_context = ssl._create_unverified_context
 #####> GLOBAL VARIABLES
 ################################################################################################
 
+# The thermal issues worker processes (spawn) import this module again: the server resources (threads, pools, database connections, storage) are only created in the server process
+# (the parent process of a spawned worker is only known after this import, its name is set before)
+IS_SERVER_PROCESS						= multiprocessing.current_process().name == "MainProcess"
+
 # Folders
 TEMPLATES_FOLDER                		= os.path.join("templates", "html")
 STATIC_FOLDER                   		= "static"
 ASSETS_FOLDER                   		= "assets"
 STORAGE_FOLDER							= os.path.join(STATIC_FOLDER, "storage")
+STORAGE_INDEX_FILE						= "storage-index.sqlite3"
+MOSAIC_FOLDER							= os.path.join(STATIC_FOLDER, "mosaics")
+REANALYSIS_CHECKPOINT_FILE				= "reanalysis-checkpoint.log"
+BLOBS_FOLDER							= os.path.join(STATIC_FOLDER, "blobs")
+BLOBS_INDEX_FILE						= "storage-blobs.sqlite3"
+THERMAL_SERIES_FOLDER					= "thermal-series"
+THUMBNAILS_MAX_AGE						= 365 * 24 * 60 * 60
 
 # Files
 STORAGE_NORMAL_INITIAL_IMAGE_FILE_NAME 	= "normal-initial-image"
 STORAGE_NORMAL_RESULT_IMAGE_FILE_NAME  	= "normal-result-image"
 STORAGE_THERMAL_INITIAL_IMAGE_FILE_NAME = "thermal-initial-image"
 STORAGE_THERMAL_RESULT_IMAGE_FILE_NAME  = "thermal-result-image"
+STORAGE_THERMAL_ARRAY_FILE_NAME 		= "thermal-array"
 STORAGE_RESULT_DATA_FILE_NAME   		= "result-data"
 
+# Encoding of the stored artifacts (PNG with a fast compression level, lossless WebP, JPEG, or NPY for the raw thermal grid)
+# An artifact with a None policy is not stored (only the raw thermal grid can be skipped)
+STORAGE_ENCODING_POLICIES				= {
+	"normal-initial" : EncodingPolicy.Png(compress_level=1),
+	"normal-result"  : EncodingPolicy.Png(compress_level=1),
+	"thermal-initial": EncodingPolicy.Png(compress_level=1),
+	"thermal-result" : EncodingPolicy.Png(compress_level=1),
+	"thermal-array"  : EncodingPolicy.Npy()
+}
+
+# Result images (detections drawn over the initial images) are stored, or drawn on demand from the predictions when False
+STORAGE_RESULT_IMAGES					= True
+RENDERED_IMAGES_MAX_AGE					= 60 * 60
+
+# Stored images are deduplicated in a content-addressed blob store (the result files point at the blobs), or written in the cell folders
+STORAGE_DEDUPLICATION					= True
+BLOB_STORE								= BlobStore(BLOBS_FOLDER, BLOBS_INDEX_FILE) if IS_SERVER_PROCESS else None
+
+# Image encoding runs in a thread pool (zlib and libwebp release the GIL): the images of a cell are encoded in parallel, while the mosaic is updated
+# The upload still waits for all the encodings before answering (the cell is stored, result file last, when the response is sent)
+IMAGE_ENCODING_WORKERS_NB				= 4
+IMAGE_ENCODING_POOL						= ThreadPoolExecutor(IMAGE_ENCODING_WORKERS_NB) if IS_SERVER_PROCESS else None
+
 # Structural issues detector
 STRUCTURAL_ISSUES_MODEL_WEIGHTS_PATH 	= os.path.join(ASSETS_FOLDER, "weights/best_weights.pt")
-STRUCTURAL_ISSUES_DETECTOR  			= StructuralIssuesDetector(STRUCTURAL_ISSUES_MODEL_WEIGHTS_PATH)
+STRUCTURAL_ISSUES_EXPORTED_WEIGHTS_PATH = os.path.join(ASSETS_FOLDER, "weights/best_weights.torchscript")
+STRUCTURAL_ISSUES_YOLOV5_REPO_PATH 		= os.path.join(ASSETS_FOLDER, "yolov5")
+STRUCTURAL_ISSUES_BATCH_SIZE			= 16
+
+# Inference backend ("pytorch", or "int8" for the quantized ONNX export of the weights on CPU-only machines, exported with --dynamic)
+STRUCTURAL_ISSUES_BACKEND				= "pytorch"
+
+# Tiled inference for high resolution frames (None analyzes the whole frame at the model input size)
+STRUCTURAL_ISSUES_TILE_SIZE				= None
+STRUCTURAL_ISSUES_TILE_OVERLAP			= 128
+
+# Offline loading when a yolov5 repository is vendored in the assets (exported weights are preferred when available)
+if FileManagement.folderExists(STRUCTURAL_ISSUES_YOLOV5_REPO_PATH):
+	STRUCTURAL_ISSUES_DETECTOR  		= StructuralIssuesDetector(
+		STRUCTURAL_ISSUES_EXPORTED_WEIGHTS_PATH if FileManagement.fileExists(STRUCTURAL_ISSUES_EXPORTED_WEIGHTS_PATH) else STRUCTURAL_ISSUES_MODEL_WEIGHTS_PATH,
+		STRUCTURAL_ISSUES_BATCH_SIZE,
+		repo_path=STRUCTURAL_ISSUES_YOLOV5_REPO_PATH,
+		lazy=True,
+		tile_size=STRUCTURAL_ISSUES_TILE_SIZE,
+		tile_overlap=STRUCTURAL_ISSUES_TILE_OVERLAP,
+		backend=STRUCTURAL_ISSUES_BACKEND
+	)
+else:
+	STRUCTURAL_ISSUES_DETECTOR  		= StructuralIssuesDetector(STRUCTURAL_ISSUES_MODEL_WEIGHTS_PATH, STRUCTURAL_ISSUES_BATCH_SIZE, lazy=True, tile_size=STRUCTURAL_ISSUES_TILE_SIZE, tile_overlap=STRUCTURAL_ISSUES_TILE_OVERLAP, backend=STRUCTURAL_ISSUES_BACKEND)
+
+# Load the model in the background while the server starts (not in the worker processes)
+if IS_SERVER_PROCESS:
+	STRUCTURAL_ISSUES_DETECTOR.warmUp()
 
 # initial_img, result_image, result_predictions = STRUCTURAL_ISSUES_DETECTOR.detectFromImage(Image.open("_.jpeg"))
 # initial_img.show()
 # exit()
 
 
-# Thermal issues detector
+# Thermal issues detector (analyses run in a process pool shared by all the requests, 0 worker runs them inline)
+# The number of workers can be set with the EPS3_THERMAL_ISSUES_WORKERS_NB environment variable (one per CPU by default)
 THERMAL_ISSUES_DETECTOR					= ThermalIssuesDetector()
+THERMAL_ISSUES_CLASSES					= [ "hot leak", "cold leak" ]
+THERMAL_ISSUES_WORKERS_NB				= int(os.environ.get("EPS3_THERMAL_ISSUES_WORKERS_NB", os.cpu_count() or 1))
+THERMAL_ISSUES_POOL						= ProcessPoolExecutor(THERMAL_ISSUES_WORKERS_NB, mp_context=multiprocessing.get_context("spawn")) if IS_SERVER_PROCESS and THERMAL_ISSUES_WORKERS_NB > 0 else None
+
+# Upload jobs (asynchronous uploads)
+UPLOAD_WORKERS_NB						= 2
+UPLOAD_MAX_PENDING_CELLS				= 256
+UPLOAD_STREAM_BUFFER_SIZE				= 1024 * 1024
+UPLOAD_JOB_QUEUE						= JobQueue(lambda job, images: uploadReportCells(job.building_name, images, job), UPLOAD_WORKERS_NB, UPLOAD_MAX_PENDING_CELLS) if IS_SERVER_PROCESS else None
 
 # Launch app
-FileManagement.createFoldersIfNotExists([ TEMPLATES_FOLDER, STATIC_FOLDER, ASSETS_FOLDER, STORAGE_FOLDER ])
+if IS_SERVER_PROCESS:
+	FileManagement.createFoldersIfNotExists([ TEMPLATES_FOLDER, STATIC_FOLDER, ASSETS_FOLDER, STORAGE_FOLDER ])
+
+# Report index (built from the existing storage the first time)
+STORAGE_INDEX_EXISTS					= FileManagement.fileExists(STORAGE_INDEX_FILE)
+REPORT_INDEX							= ReportIndex(STORAGE_INDEX_FILE) if IS_SERVER_PROCESS else None
+if IS_SERVER_PROCESS and not STORAGE_INDEX_EXISTS:
+	REPORT_INDEX.rebuild(STORAGE_FOLDER)
+
+# Thermal grids of each building appended in memory-mapped series (history, trends and differences of the cells, built from the stored grids the first time)
+THERMAL_SERIES_EXISTS					= FileManagement.folderExists(THERMAL_SERIES_FOLDER)
+THERMAL_SERIES							= ThermalSeriesStore(THERMAL_SERIES_FOLDER) if IS_SERVER_PROCESS else None
+if IS_SERVER_PROCESS and not THERMAL_SERIES_EXISTS:
+	THERMAL_SERIES.rebuild(STORAGE_FOLDER, EncodingPolicy.loadArray)
+
+# Parsed analyses caches (cells by (building, day, row, column), reports by (building, day)), sizes in bytes of JSON
+# The caches are cleared when the index is written by another process (reanalysis and blob migration command line tools)
+CACHES_SOURCE_VERSION					= REPORT_INDEX.dataVersion if IS_SERVER_PROCESS else None
+ANALYSIS_CACHE							= LruCache(max_entries=4096, max_size=32 * 1024 * 1024, source_version=CACHES_SOURCE_VERSION)
+REPORT_CACHE							= LruCache(max_entries=64, max_size=32 * 1024 * 1024, source_version=CACHES_SOURCE_VERSION)
+
+# Reanalysis of the stored cells with the current detectors (resumable, one at a time)
+REANALYSIS								= Reanalysis(lambda cell_folders: reanalyseReportCells(cell_folders), REANALYSIS_CHECKPOINT_FILE, STRUCTURAL_ISSUES_BATCH_SIZE)
+
+# Result images drawn on demand, encoded (by (building, day, row, column, camera, thumbnail)), sizes in bytes
+RENDERED_IMAGES_CACHE					= LruCache(max_entries=1024, max_size=64 * 1024 * 1024, source_version=CACHES_SOURCE_VERSION)
+
+# Stage and request durations (histograms exposed at /metrics)
+METRICS									= Metrics()
+METRICS.register("eps3_stage_duration_seconds", "Duration of the upload and report stages")
+METRICS.register("eps3_request_duration_seconds", "Duration of the HTTP requests")
+
+# Opt-in request profiling: a cProfile dump per profiled request (asked with ?profile=1, or sampled)
+PROFILING_ENABLED						= False
+PROFILING_SAMPLE_RATE					= 0.0
+PROFILES_FOLDER							= "profiles"
+
 app = Flask(__name__, template_folder=TEMPLATES_FOLDER, static_folder=STATIC_FOLDER)
 
+@app.before_request
+def startRequestTiming():
+	g.request_start = time.perf_counter()
+	g.profiler      = None
+	if PROFILING_ENABLED and (request.args.get("profile") == "1" or random.random() < PROFILING_SAMPLE_RATE):
+		g.profiler = cProfile.Profile()
+		g.profiler.enable()
+
+@app.after_request
+def stopRequestTiming(response : Response):
+
+	# Streamed responses are timed until their first byte only
+	METRICS.observe("eps3_request_duration_seconds", time.perf_counter() - g.request_start, endpoint=request.endpoint, method=request.method, status=response.status_code)
+
+	if g.profiler is not None:
+		g.profiler.disable()
+		FileManagement.createFolderIfNotExists(PROFILES_FOLDER)
+		profile_path = os.path.join(PROFILES_FOLDER, "{}-{}.prof".format(datetime.now().strftime('%Y%m%d-%H%M%S-%f'), request.endpoint))
+		g.profiler.dump_stats(profile_path)
+		g.profiler = None
+		response.headers["X-Profile"] = profile_path
+
+	return response
+
+@app.teardown_request
+def stopRequestProfiling(error : Exception = None):
+	# Failed requests skip after_request, the profiler must not keep running
+	if g.get("profiler") is not None:
+		g.profiler.disable()
+
 ################################################################################################
 #####> UTIL METHODS
 ################################################################################################
 
+# Upload the report files of all the wall cells of a building, the normal images are analyzed in batches
+# When a job is given, the progress is reported on it and a failing cell does not stop the others
+def uploadReportCells(building_name : str, images : list, job : Job = None):
+
+	# Thermal analyses are fanned out to the process pool while the structural model runs here
+	thermal_detections = [ detectThermalIssuesAsync(image_data["thermal_array"]) for image_data in images ]
+	with METRICS.span("eps3_stage_duration_seconds", stage="get_pil_image"):
+		normal_imgs = [ getPilImage(image_data["normal_array"]) for image_data in images ]
+	with METRICS.span("eps3_stage_duration_seconds", stage="structural_issues"):
+		normal_detections = STRUCTURAL_ISSUES_DETECTOR.detectFromImages(normal_imgs, STORAGE_RESULT_IMAGES)
+
+	analyses = []
+	for index, (image_data, normal_detection, thermal_detection) in enumerate(zip(images, normal_detections, thermal_detections)):
+		cell_data = {
+			"building_name": building_name,
+			"row"          : image_data["row"],
+			"column"       : image_data["col"]
+		}
+
+		if job is None:
+			analyses.append(uploadReportFiles(cell_data, image_data["normal_array"], image_data["thermal_array"], normal_detection, waitThermalIssues(thermal_detection)))
+			continue
+
+		try:
+			analysis = uploadReportFiles(cell_data, image_data["normal_array"], image_data["thermal_array"], normal_detection, waitThermalIssues(thermal_detection))
+			analyses.append(analysis)
+			job.cellDone(index, analysis)
+		except Exception as e:
+			job.cellFailed(index, e)
+
+	return analyses
+
 # Upload the report files in the STORAGE_FOLDER
-def uploadReportFiles(data : dict, normal_arr : list, thermal_arr : list):
+def uploadReportFiles(data : dict, normal_arr : list, thermal_arr : list, normal_detection : tuple = None, thermal_detection : tuple = None):
 
 	# Sanitize data
 	date_time             = datetime.now()
@@ -64,23 +250,44 @@ def uploadReportFiles(data : dict, normal_arr : list, thermal_arr : list):
 	if FileManagement.folderExists(base_folder_path):
 		raise Exception("Data already exists for the id (building_name, time, row, column)")
 	FileManagement.createFolderIfNotExists(base_folder_path)
+	result_data_full_path = os.path.join(base_folder_path, STORAGE_RESULT_DATA_FILE_NAME + "." + "json")
 
-	# Create paths
-	normal_initial_image_full_path  = os.path.join(base_folder_path, STORAGE_NORMAL_INITIAL_IMAGE_FILE_NAME  + ".png") 
-	normal_result_image_full_path   = os.path.join(base_folder_path, STORAGE_NORMAL_RESULT_IMAGE_FILE_NAME   + ".png")
-	thermal_initial_image_full_path = os.path.join(base_folder_path, STORAGE_THERMAL_INITIAL_IMAGE_FILE_NAME + ".png")
-	thermal_result_image_full_path  = os.path.join(base_folder_path, STORAGE_THERMAL_RESULT_IMAGE_FILE_NAME  + ".png")
-	result_data_full_path           = os.path.join(base_folder_path, STORAGE_RESULT_DATA_FILE_NAME   + "." + "json")
-	
 	# Make detections
-	normal_initial_img, normal_result_image, normal_result_predictions = STRUCTURAL_ISSUES_DETECTOR.detectFromArray(normal_arr)
-	thermal_initial_img, thermal_result_image, thermal_result_predictions = THERMAL_ISSUES_DETECTOR.detectFromArray(thermal_arr)
+	if normal_detection is None:
+		with METRICS.span("eps3_stage_duration_seconds", stage="structural_issues"):
+			normal_detection = STRUCTURAL_ISSUES_DETECTOR.detectFromArray(normal_arr, STORAGE_RESULT_IMAGES)
+	normal_initial_img, normal_result_image, normal_result_predictions = normal_detection
+	if thermal_detection is None:
+		with METRICS.span("eps3_stage_duration_seconds", stage="thermal_issues"):
+			thermal_detection = THERMAL_ISSUES_DETECTOR.detectFromArray(thermal_arr)
+	thermal_initial_img, thermal_result_image, thermal_result_predictions = thermal_detection
+
+	# Save result images and their thumbnails (displayed in the report tables) in the encoding pool
+	saved_images = {
+		"normal": {
+			"initial": saveReportImageAsync(normal_initial_img,   base_folder_path, STORAGE_NORMAL_INITIAL_IMAGE_FILE_NAME,  "normal-initial")
+		},
+		"thermal": {
+			"initial": saveReportImageAsync(thermal_initial_img,  base_folder_path, STORAGE_THERMAL_INITIAL_IMAGE_FILE_NAME, "thermal-initial")
+		}
+	}
+	if STORAGE_RESULT_IMAGES:
+		saved_images["normal"]["result"]  = saveReportImageAsync(normal_result_image,  base_folder_path, STORAGE_NORMAL_RESULT_IMAGE_FILE_NAME,  "normal-result")
+		saved_images["thermal"]["result"] = saveReportImageAsync(thermal_result_image, base_folder_path, STORAGE_THERMAL_RESULT_IMAGE_FILE_NAME, "thermal-result")
+
+	# Save the raw thermal grid (kept for later reanalyses)
+	thermal_array_policy = STORAGE_ENCODING_POLICIES.get("thermal-array")
+	if thermal_array_policy is not None:
+		thermal_array_future = IMAGE_ENCODING_POOL.submit(thermal_array_policy.save, thermal_arr, base_folder_path, STORAGE_THERMAL_ARRAY_FILE_NAME)
 
-	# Save result images
-	normal_initial_img.save(normal_initial_image_full_path)
-	thermal_initial_img.save(thermal_initial_image_full_path)
-	normal_result_image.save(normal_result_image_full_path)
-	thermal_result_image.save(thermal_result_image_full_path)
+	# Add the cell to the wall mosaic
+	with METRICS.span("eps3_stage_duration_seconds", stage="mosaic_update"):
+		addMosaicCell(data["building_name"], data["date"], data["row"], data["column"], normal_initial_img, normal_result_image, normal_result_predictions, thermal_initial_img, thermal_result_image)
+
+	# Wait for the encodings before writing the result file (result images that are not stored have None paths)
+	with METRICS.span("eps3_stage_duration_seconds", stage="encoding_wait"):
+		images     = { kind: { "result": None, **{ step: future.result()[0] for step, future in futures.items() } } for kind, futures in saved_images.items() }
+		thumbnails = { kind: { "result": None, **{ step: future.result()[1] for step, future in futures.items() } } for kind, futures in saved_images.items() }
 
 	# Merge predictions for json
 	all_predictions = normal_result_predictions + thermal_result_predictions
@@ -93,74 +300,297 @@ def uploadReportFiles(data : dict, normal_arr : list, thermal_arr : list):
 			"column"       : str(data["column"]),
 			"row"          : str(data["row"])
 		},
-		"images": {
-			"normal": {
-				"initial": normal_initial_image_full_path,
-				"result" : normal_result_image_full_path
-			},
-			"thermal": {
-				"initial": thermal_initial_image_full_path,
-				"result" : thermal_result_image_full_path
-			}
-		},
+		"images": images,
+		"thumbnails": thumbnails,
 		"predictions": all_predictions,
 		"issues_nb": dict(Counter(all_predictions_class_name))
 	}
+	if thermal_array_policy is not None:
+		result_json["arrays"] = { "thermal": thermal_array_future.result() }
+
+	# Save result data (last: the cell becomes visible in the reports once complete)
+	saveResultData(result_data_full_path, result_json)
 
-	# Save result data
-	with open(result_data_full_path, 'w') as f:
-		f.write(json.dumps(result_json, indent=4))
+	# Append the frame to the thermal series (after the result file: a failed upload leaves no orphan frame)
+	with METRICS.span("eps3_stage_duration_seconds", stage="thermal_series"):
+		THERMAL_SERIES.append(data["building_name"], data["date"], data["row"], data["column"], thermal_arr)
 
 	# Return full paths
 	return getPartialAnalysis(data["building_name"], data["date"], data["row"], data["column"])
 
+# Add a wall cell to its mosaic, without result image the normal boxes are drawn on the downscaled tile
+# Without thermal images, the thermal tiles are left as they are
+def addMosaicCell(building_name : str, day : str, row : str, column : str, normal_initial_img : Image, normal_result_image : Image, normal_result_predictions : list, thermal_initial_img : Image, thermal_result_image : Image):
+
+	images = { "normal-initial": normal_initial_img }
+	predictions = {}
+	if normal_result_image is not None:
+		images["normal-result"] = normal_result_image
+	else:
+		predictions["normal-result"] = ("normal-initial", normal_result_predictions)
+	if thermal_initial_img is not None:
+		images["thermal-initial"] = thermal_initial_img
+		images["thermal-result"]  = thermal_result_image
+
+	WallMosaic(MOSAIC_FOLDER, building_name, day).addCell(int(row), int(column), images, predictions)
+
+# Save the result data of a cell atomically, then update the index and the caches
+def saveResultData(result_data_full_path : str, result_json : dict):
+
+	metadata = result_json["metadata"]
+	with METRICS.span("eps3_stage_duration_seconds", stage="save_result_data"):
+		FileManagement.writeFileAtomically(result_data_full_path, json.dumps(result_json, indent=4))
+	with METRICS.span("eps3_stage_duration_seconds", stage="report_index"):
+		REPORT_INDEX.addAnalysis(result_json)
+	ANALYSIS_CACHE.invalidate((metadata["building_name"], metadata["day"], metadata["row"], metadata["column"]))
+	REPORT_CACHE.invalidate((metadata["building_name"], metadata["day"]))
+	for camera in [ "normal", "thermal" ]:
+		for thumbnail in [ False, True ]:
+			RENDERED_IMAGES_CACHE.invalidate((metadata["building_name"], metadata["day"], metadata["row"], metadata["column"], camera, thumbnail))
+
+# Re-run the detectors on stored wall cells (by folder)
+# Returns an error (or None) per cell and the cells whose thermal results were kept (raw thermal grid not stored)
+def reanalyseReportCells(cell_folders : list):
+
+	# Thermal analyses are fanned out to the process pool (only the cells having their raw thermal grid stored) while the structural model runs here
+	errors             = [ None for _ in cell_folders ]
+	analyses           = {}
+	normal_images      = {}
+	thermal_detections = {}
+	for index, cell_folder in enumerate(cell_folders):
+		try:
+			with open(os.path.join(cell_folder, STORAGE_RESULT_DATA_FILE_NAME + "." + "json"), "r") as f:
+				analysis = json.load(f)
+			thermal_arr = EncodingPolicy.loadArray(analysis["arrays"]["thermal"]) if "arrays" in analysis else None
+			normal_images[index] = Image.open(analysis["images"]["normal"]["initial"]).convert("RGB")
+		except Exception as e:
+			errors[index] = e
+			continue
+
+		analyses[index] = analysis
+		if thermal_arr is not None:
+			thermal_detections[index] = detectThermalIssuesAsync(thermal_arr)
+
+	try:
+		normal_detections = STRUCTURAL_ISSUES_DETECTOR.detectFromImages(list(normal_images.values()), STORAGE_RESULT_IMAGES)
+	except Exception as e:
+		return [ error if error is not None else e for error in errors ], []
+
+	for (index, analysis), normal_detection in zip(analyses.items(), normal_detections):
+		try:
+			thermal_detection = thermal_detections[index].result() if index in thermal_detections else None
+			saveReanalysis(cell_folders[index], analysis, normal_detection, thermal_detection)
+		except Exception as e:
+			errors[index] = e
+
+	return errors, [ cell_folders[index] for index in analyses if index not in thermal_detections and errors[index] is None ]
+
+# Replace the results of a stored wall cell, the initial images are kept
+# Without thermal detection (raw thermal grid not stored), the thermal results (files, predictions and mosaic tiles) are kept
+def saveReanalysis(base_folder_path : str, analysis : dict, normal_detection : tuple, thermal_detection : tuple = None):
+
+	normal_initial_img, normal_result_image, normal_result_predictions = normal_detection
+	if thermal_detection is None:
+		cameras = [ "normal" ]
+		thermal_initial_img, thermal_result_image = None, None
+		thermal_result_predictions = [ prediction for prediction in analysis["predictions"] if prediction["class"] in THERMAL_ISSUES_CLASSES ]
+	else:
+		cameras = [ "normal", "thermal" ]
+		thermal_initial_img, thermal_result_image, thermal_result_predictions = thermal_detection
+
+	# Save result images and their thumbnails in the encoding pool
+	previous_files = [ analysis[files][camera].get("result") for files in [ "images", "thumbnails" ] for camera in cameras if files in analysis ]
+	saved_images = {}
+	if STORAGE_RESULT_IMAGES:
+		saved_images["normal"] = saveReportImageAsync(normal_result_image, base_folder_path, STORAGE_NORMAL_RESULT_IMAGE_FILE_NAME, "normal-result")
+		if thermal_detection is not None:
+			saved_images["thermal"] = saveReportImageAsync(thermal_result_image, base_folder_path, STORAGE_THERMAL_RESULT_IMAGE_FILE_NAME, "thermal-result")
+
+	# Update the cell in the wall mosaic
+	metadata = analysis["metadata"]
+	addMosaicCell(metadata["building_name"], metadata["day"], metadata["row"], metadata["column"], normal_initial_img, normal_result_image, normal_result_predictions, thermal_initial_img, thermal_result_image)
+
+	# Wait for the encodings
+	analysis.setdefault("thumbnails", { "normal": {}, "thermal": {} })
+	for camera in cameras:
+		analysis["images"][camera]["result"], analysis["thumbnails"][camera]["result"] = saved_images[camera].result() if camera in saved_images else (None, None)
+
+	all_predictions = normal_result_predictions + thermal_result_predictions
+	analysis["predictions"] = all_predictions
+	analysis["issues_nb"]   = dict(Counter(map(lambda pred: pred["class"], all_predictions)))
+	saveResultData(os.path.join(base_folder_path, STORAGE_RESULT_DATA_FILE_NAME + "." + "json"), analysis)
+
+	# Files of the previous results that are not used anymore (thumbnails are named after their content), blobs lose a reference
+	current_files = [ analysis[files][camera]["result"] for files in [ "images", "thumbnails" ] for camera in cameras ]
+	for path in previous_files:
+		if BLOB_STORE.owns(path):
+			BLOB_STORE.release(path)
+		elif path is not None and path not in current_files:
+			FileManagement.deleteFile(path)
+
+	return analysis
+
+# Settings of the detectors, a reanalysis is only resumed with the same ones
+def getReanalysisSettings():
+
+	model_path = STRUCTURAL_ISSUES_DETECTOR.modelPath()
+	return {
+		"structural_issues_model"     : model_path,
+		"structural_issues_model_date": os.path.getmtime(model_path) if FileManagement.fileExists(model_path) else None,
+		"structural_issues_conf"      : STRUCTURAL_ISSUES_DETECTOR.conf,
+		"structural_issues_backend"   : STRUCTURAL_ISSUES_DETECTOR.backend,
+		"structural_issues_tiles"     : [ STRUCTURAL_ISSUES_DETECTOR.tile_size, STRUCTURAL_ISSUES_DETECTOR.tile_overlap ],
+		"thermal_issues_leak_offset"  : THERMAL_ISSUES_DETECTOR.leak_offset,
+		"thermal_issues_color_palette": THERMAL_ISSUES_DETECTOR.color_palette,
+		"result_images"               : STORAGE_RESULT_IMAGES
+	}
+
+# Save a report image and its thumbnail in the encoding pool, returns a future of (image_path, thumbnail_path)
+def saveReportImageAsync(img : Image, folder : str, file_name : str, artifact : str):
+	return IMAGE_ENCODING_POOL.submit(saveReportImage, img, folder, file_name, artifact)
+
+# Save a report image and its thumbnail, returns (image_path, thumbnail_path)
+def saveReportImage(img : Image, folder : str, file_name : str, artifact : str):
+
+	policy = STORAGE_ENCODING_POLICIES[artifact]
+	with METRICS.span("eps3_stage_duration_seconds", stage="encode_image", artifact=artifact):
+		content = policy.encode(img)
+
+	with METRICS.span("eps3_stage_duration_seconds", stage="write_image", artifact=artifact):
+		if STORAGE_DEDUPLICATION:
+			image_path = BLOB_STORE.put(content, policy.extension())
+		else:
+			image_path = policy.path(folder, file_name)
+			with open(image_path, 'wb') as f:
+				f.write(content)
+
+	with METRICS.span("eps3_stage_duration_seconds", stage="thumbnail", artifact=artifact):
+		thumbnail_path = saveThumbnail(img, folder, file_name)
+
+	return image_path, thumbnail_path
+
+# Wait for a thermal analysis of the process pool (time spent by the request, the analysis itself runs in parallel)
+def waitThermalIssues(thermal_detection : Future):
+	with METRICS.span("eps3_stage_duration_seconds", stage="thermal_issues_wait"):
+		return thermal_detection.result()
+
+# Draw the result image of a stored analysis (camera is normal or thermal)
+def renderResultImage(analysis : dict, camera : str):
+
+	# The thermal overlay is recomputed from the raw thermal grid when it is stored (same pixels as at upload)
+	if camera == "thermal" and "arrays" in analysis:
+		return THERMAL_ISSUES_DETECTOR.detectFromArray(EncodingPolicy.loadArray(analysis["arrays"]["thermal"]))[1]
+
+	predictions = [ prediction for prediction in analysis["predictions"] if (prediction["class"] in THERMAL_ISSUES_CLASSES) == (camera == "thermal") ]
+	return drawPredictions(Image.open(analysis["images"][camera]["initial"]), predictions)
+
+# Encoded result image of a stored analysis (full size PNG or WebP thumbnail), cached
+def getRenderedResultImage(analysis : dict, camera : str, thumbnail : bool):
+
+	def render():
+		img = renderResultImage(analysis, camera)
+		if thumbnail:
+			img.thumbnail((200, 200))
+			return EncodingPolicy("WEBP", quality=80).encode(img)
+		return EncodingPolicy.Png(compress_level=1).encode(img)
+
+	metadata = analysis["metadata"]
+	key = (metadata["building_name"], metadata["day"], metadata["row"], metadata["column"], camera, thumbnail)
+	return RENDERED_IMAGES_CACHE.getOrCompute(key, render, len)
+
+# Run the thermal analysis of a wall cell in the process pool, returns a future
+def detectThermalIssuesAsync(thermal_arr : list):
+
+	if THERMAL_ISSUES_POOL is None:
+		future = Future()
+		try:
+			future.set_result(THERMAL_ISSUES_DETECTOR.detectFromArray(thermal_arr))
+		except Exception as e:
+			future.set_exception(e)
+		return future
+
+	# Arrays are much cheaper to send to the workers than nested lists
+	return THERMAL_ISSUES_POOL.submit(THERMAL_ISSUES_DETECTOR.detectFromArray, np.asarray(thermal_arr))
+
 # Get the report data for a wall cell of a building at a time
 def getPartialAnalysis(building_name : str, day_string : str, row : int, column : int):
 		
-	# Get JSON data
-	analysis_json = os.path.join(STORAGE_FOLDER, FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(day_string), FileManagement.sanitizeFileName(row), FileManagement.sanitizeFileName(column), STORAGE_RESULT_DATA_FILE_NAME + ".json")
-	with open(analysis_json, "r") as f:
-		analysis_data = json.load(f)
-
-	return analysis_data
+	key = (FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(day_string), FileManagement.sanitizeFileName(row), FileManagement.sanitizeFileName(column))
+	return ANALYSIS_CACHE.getOrCompute(key, lambda: REPORT_INDEX.analysis(*key), getCacheSize)
 
-# Get the report data for a building at a time
+# Get the report data for a building at a time (cached until a cell of the building is uploaded for this day)
 def getCompleteAnalysis(building_name : str, day_string : str):
 
+	key = (FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(day_string))
+	return REPORT_CACHE.getOrCompute(key, lambda: computeCompleteAnalysis(*key), getCacheSize)
+
+# Approximate memory used by a cached analysis
+def getCacheSize(value):
+	return len(json.dumps(value, default=str))
+
+# Build the report data for a building at a time
+def computeCompleteAnalysis(building_name : str, day_string : str):
+
 	result = {}
 
 	# All analysis results
-	analysis_results = []
-	main_directory = os.path.join(STORAGE_FOLDER, FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(day_string))
-	for (row_folder_name, row_folder_full_path) in FileManagement.subFolders(main_directory):
-		for (col_folder_name, col_folder_full_path) in FileManagement.subFolders(row_folder_full_path):
-			# An analysis result
-			analysis_results.append(getPartialAnalysis(building_name, day_string, row_folder_name, col_folder_name))
+	analysis_results = REPORT_INDEX.analyses(FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(day_string))
 	result["analysis_results"] = analysis_results
 
-	# Building issues counter
-	class_name_predictions = [ prediction_data["class"] for analysis_data in analysis_results for prediction_data in analysis_data["predictions"] ]
-	class_name_counter     = Counter(class_name_predictions)
-	result["class_name_count"] = class_name_counter
-	
-	# Building big image
-	max_column      = max([ int(analysis_data["metadata"]["column"]) for analysis_data in analysis_results  ])
-	max_row         = max([ int(analysis_data["metadata"]["row"])    for analysis_data in analysis_results  ])
+	# Building issues counter and big image, from the summary maintained at upload time
+	summary = REPORT_INDEX.daySummary(building_name, day_string) or { "class_name_count": {}, "max_row": 0, "max_column": 0, "cells": {} }
+	result["class_name_count"] = summary["class_name_count"]
+
+	max_column      = summary["max_column"]
+	max_row         = summary["max_row"]
 	big_original_image_matrix  = [ [ None for j in range(max_column + 1) ]  for i in range(max_row + 1) ]
-	for analysis_data in analysis_results:
-		col = int(analysis_data["metadata"]["column"])
-		row = int(analysis_data["metadata"]["row"])
+	for cell in summary["cells"].values():
+		col = int(cell["column"])
+		row = int(cell["row"])
 
 		big_original_image_matrix[max_row-row][col] = {
-			"normal_initial_image_path"  : str(analysis_data["images"]["normal"]["initial"]),
-			"normal_result_image_path"   : str(analysis_data["images"]["normal"]["result"]),
-			"thermal_initial_image_path" : str(analysis_data["images"]["thermal"]["initial"]),
-			"thermal_result_image_path"  : str(analysis_data["images"]["thermal"]["result"]),
+			"normal_initial_image_path"  : cell["normal_initial_image_path"],
+			"normal_result_image_path"   : cell["normal_result_image_path"]  or getRenderedResultPath(building_name, day_string, row, col, "normal"),
+			"thermal_initial_image_path" : cell["thermal_initial_image_path"],
+			"thermal_result_image_path"  : cell["thermal_result_image_path"] or getRenderedResultPath(building_name, day_string, row, col, "thermal"),
 		}
 	result["big_original_image_matrix"] = big_original_image_matrix
 
 	return result
 
+# Get the wall mosaic description of a building at a time (built from the stored images if it does not exist yet)
+def getMosaic(building_name : str, day_string : str):
+
+	building_name, day_string = FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(day_string)
+	summary = REPORT_INDEX.daySummary(building_name, day_string)
+	if summary is None:
+		return None
+
+	# Cells without their tiles (mosaic deleted, cells stored before the mosaics or whose tiles failed) are added back
+	mosaic = WallMosaic(MOSAIC_FOLDER, building_name, day_string)
+	for cell in summary["cells"].values():
+		if mosaic.hasCell(int(cell["row"]), int(cell["column"])):
+			continue
+		analysis = None
+		if cell["normal_result_image_path"] is None or cell["thermal_result_image_path"] is None:
+			analysis = getPartialAnalysis(building_name, day_string, cell["row"], cell["column"])
+		addMosaicCell(
+			building_name, day_string, cell["row"], cell["column"],
+			Image.open(cell["normal_initial_image_path"]),
+			Image.open(cell["normal_result_image_path"]) if cell["normal_result_image_path"] else None,
+			[ prediction for prediction in analysis["predictions"] if prediction["class"] not in THERMAL_ISSUES_CLASSES ] if analysis is not None else [],
+			Image.open(cell["thermal_initial_image_path"]),
+			Image.open(cell["thermal_result_image_path"]) if cell["thermal_result_image_path"] else renderResultImage(analysis, "thermal")
+		)
+
+	rows, columns = summary["max_row"] + 1, summary["max_column"] + 1
+	return {
+		"rows"     : rows,
+		"columns"  : columns,
+		"level"    : WallMosaic.overviewLevel(rows, columns),
+		"max_level": WallMosaic.MAX_LEVEL
+	}
+
 # Get all the analysis dates of a bulding 
 def getAllAnalysisDatesOfBuilding(building_name : str):
     return [ 
@@ -168,14 +598,33 @@ def getAllAnalysisDatesOfBuilding(building_name : str):
 			"human"    : getReadableDate(date_file_path),
 			"program" : date_file_path
 		}
-		for (date_file_path, date_file_full_path) 
-		in FileManagement.subFolders(os.path.join(STORAGE_FOLDER, FileManagement.sanitizeFileName(building_name)))
+		for date_file_path
+		in REPORT_INDEX.days(FileManagement.sanitizeFileName(building_name))
 	]
 
+# Get the url of the thumbnail of a stored image (the full image for analyses stored without thumbnails)
+def getThumbnailUrl(analysis : dict, camera : str, kind : str):
+
+	if analysis["images"][camera][kind] is None:
+		metadata = analysis["metadata"]
+		return url_for("rendered_result_image", building_name=metadata["building_name"], day_string=metadata["day"], row=metadata["row"], column=metadata["column"], camera=camera, size="thumbnail")
+
+	# Cells stored before the thumbnails existed (or only partly reanalysed since) use the full image
+	if analysis.get("thumbnails", {}).get(camera, {}).get(kind) is None:
+		return "/" + analysis["images"][camera][kind]
+
+	return url_for("thumbnail", thumbnail_path=analysis["thumbnails"][camera][kind])
+
+# Path of the result image drawn on demand (relative to the site root, like the stored image paths)
+def getRenderedResultPath(building_name : str, day_string : str, row : int, column : int, camera : str):
+	return "/".join([ "render", building_name, day_string, str(row), str(column), camera ])
+
 # Get a readable data from the storage date
 def getReadableDate(storageDate : str):
     return datetime.strptime(storageDate, '%Y%m%d').date().strftime('%d/%m/%Y')
 
+app.add_template_global(getThumbnailUrl, "thumbnail_url")
+
 ################################################################################################
 #####> DELETE REQUESTS
 ################################################################################################
@@ -185,6 +634,13 @@ def getReadableDate(storageDate : str):
 def apiClear():
 	FileManagement.deleteFoldersRecursively(STORAGE_FOLDER)
 	FileManagement.createFolderIfNotExists(STORAGE_FOLDER)
+	FileManagement.deleteFoldersRecursively(MOSAIC_FOLDER)
+	REPORT_INDEX.clear()
+	BLOB_STORE.clear()
+	THERMAL_SERIES.clear()
+	ANALYSIS_CACHE.clear()
+	REPORT_CACHE.clear()
+	RENDERED_IMAGES_CACHE.clear()
 
 	return "Cleared"
 		
@@ -196,31 +652,124 @@ def apiClear():
 @app.route('/api/upload', methods=['POST'])
 def apiUpload():
     
-	json_data = request.json
-	building_name = json_data["building_name"]
-	images = json_data["images"]
+	# Binary uploads (multipart with NPY / NPZ / PNG / raw files), JSON nested arrays otherwise
+	with METRICS.span("eps3_stage_duration_seconds", stage="decode_upload"):
+		if request.mimetype == "multipart/form-data":
+			building_name, images = UploadDecoder.FromMultipart(request.form, request.files)
+		else:
+			json_data = request.json
+			building_name = json_data["building_name"]
+			images = json_data["images"]
+
+	# Asynchronous mode: the cells are analyzed by the job workers, the job status can be polled
+	if request.args.get("mode") == "async":
+		try:
+			job = UPLOAD_JOB_QUEUE.submit(building_name, images)
+		except JobQueueFullException as e:
+			return jsonify({ "error": str(e) }), 429, { "Retry-After": "10" }
+		except JobTooLargeException as e:
+			return jsonify({ "error": str(e) }), 413
+
+		return jsonify({ "job_id": job.id, "status_link": url_for("apiJob", job_id=job.id) }), 202
  
-	for image_data in images:
-     
-		row, col, normal_arr, thermal_arr = image_data["row"], image_data["col"], image_data["normal_array"], image_data["thermal_array"]
-     
-		uploadReportFiles(
-			{
-				"building_name": building_name,
-				"row"          : row,
-				"column"       : col
-			}, 
-			normal_arr,
-			thermal_arr
-		)
-
-	# TODO: return the link		
-	return ""
+	analyses = uploadReportCells(building_name, images)
+	if len(analyses) == 0:
+		return ""
+
+	return url_for("report", building_name=analyses[-1]["metadata"]["building_name"], day_string=analyses[-1]["metadata"]["day"])
+
+# Upload images as a stream (NDJSON, one wall cell per line), each cell is analyzed and stored as soon as it is received
+@app.route('/api/upload/stream', methods=['POST'])
+def apiUploadStream():
+
+	# Each line may name its own building, the query parameter is the default one
+	building_name = request.args.get("building_name")
+	if not building_name:
+		return jsonify({ "error": "Missing building_name query parameter" }), 400
+
+	def uploadCells():
+		# Buffered: the raw request stream is read one byte at a time when iterated by lines
+		for line in io.BufferedReader(request.stream, UPLOAD_STREAM_BUFFER_SIZE):
+			if len(line.strip()) == 0:
+				continue
+
+			cell_status = { "row": None, "col": None }
+			try:
+				image_data = json.loads(line)
+				cell_status = { "row": image_data.get("row"), "col": image_data.get("col") }
+				cell_building_name = image_data.get("building_name", building_name)
+				if not cell_building_name:
+					raise Exception("Missing building_name")
+				analysis = uploadReportCells(cell_building_name, [ image_data ])[0]
+				cell_status["status"] = "done"
+				cell_status["link"]   = url_for("report", building_name=analysis["metadata"]["building_name"], day_string=analysis["metadata"]["day"])
+			except Exception as e:
+				cell_status["status"] = "failed"
+				cell_status["error"]  = str(e)
+
+			# Free the cell before reading the next one
+			image_data = None
+			yield json.dumps(cell_status) + "\n"
+
+	return Response(stream_with_context(uploadCells()), mimetype="application/x-ndjson")
 
 ################################################################################################
 #####> GET REQUESTS
 ################################################################################################
 
+# Stage and request duration histograms (Prometheus text format)
+@app.route('/metrics', methods=['GET'])
+def metrics():
+	return Response(METRICS.toPrometheus(), mimetype="text/plain; version=0.0.4")
+
+# Blob store statistics (bytes stored, bytes saved by the deduplication)
+@app.route('/api/blobs', methods=['GET'])
+def apiBlobs():
+	return jsonify(BLOB_STORE.stats())
+
+# Analysis caches statistics (hits, misses, size...)
+@app.route('/api/cache', methods=['GET'])
+def apiCache():
+	return jsonify({
+		"analyses": ANALYSIS_CACHE.stats(),
+		"reports" : REPORT_CACHE.stats()
+	})
+
+# Upload job status (progress of an asynchronous upload)
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def apiJob(job_id : str):
+
+	job = UPLOAD_JOB_QUEUE.get(job_id)
+	if job is None:
+		return jsonify({ "error": "Unknown job" }), 404
+
+	job_json = job.toJson()
+	job_json["link"] = None
+	if job.day is not None:
+		job_json["link"] = url_for("report", building_name=FileManagement.sanitizeFileName(job.building_name), day_string=job.day)
+
+	return jsonify(job_json)
+
+# Reanalyse the stored cells with the current detectors (all of them, or some buildings / days), in the background
+@app.route('/api/reanalyse', methods=['POST'])
+def apiReanalyse():
+
+	data           = request.get_json(silent=True) or {}
+	building_names = [ FileManagement.sanitizeFileName(building_name) for building_name in data["buildings"] ] if data.get("buildings") else None
+	days           = [ FileManagement.sanitizeFileName(day) for day in data["days"] ] if data.get("days") else None
+
+	try:
+		REANALYSIS.start(Reanalysis.findCells(STORAGE_FOLDER, building_names, days), getReanalysisSettings(), bool(data.get("restart", False)))
+	except ReanalysisRunningException as e:
+		return jsonify({ "error": str(e) }), 409
+
+	return jsonify({ "status_link": url_for("apiReanalysisStatus") }), 202
+
+# Reanalysis progress and throughput
+@app.route('/api/reanalyse', methods=['GET'])
+def apiReanalysisStatus():
+	return jsonify(REANALYSIS.status())
+
 # Historic report (historic evolution of a wall cell)
 @app.route('/historic-report/<building_name>/<row>/<column>', methods=['GET'])
 def historic_report(building_name : str, row : int, column : int):
@@ -228,17 +777,31 @@ def historic_report(building_name : str, row : int, column : int):
 	day_analysis = {}
 	day_predictions_count = []
 
-	building_folder_full_path = os.path.join(STORAGE_FOLDER, FileManagement.sanitizeFileName(building_name))
-	for (date_file_path, date_file_full_path) in FileManagement.subFolders(building_folder_full_path):		
-		day_string = date_file_path
-		analysis = getPartialAnalysis(building_name, day_string, row, column)
+	with METRICS.span("eps3_stage_duration_seconds", stage="cell_history"):
+		cell_history = REPORT_INDEX.cellHistory(FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(row), FileManagement.sanitizeFileName(column))
+
+	for (day_string, analysis) in cell_history:
 		day_analysis[getReadableDate(day_string)] = analysis
 
-		predictions_count = dict(Counter([ prediction["class"] for prediction in analysis["predictions"] ]))
+		predictions_count = dict(analysis["issues_nb"])
 		predictions_count["date"] = getReadableDate(day_string)
 		day_predictions_count.append(predictions_count)
-	
-	return render_template("part/historic_report.html", day_analysis=day_analysis, day_predictions_count=day_predictions_count)
+
+	# Temperatures of the cell by day, and the difference maps with the previous day (sliced from the thermal series)
+	with METRICS.span("eps3_stage_duration_seconds", stage="thermal_trend"):
+		temperature_trend = THERMAL_SERIES.cellTrend(FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(row), FileManagement.sanitizeFileName(column))
+	day_differences = {}
+	for previous, current in zip(temperature_trend, temperature_trend[1:]):
+		day_differences[getReadableDate(current["day"])] = url_for("thermal_difference", building_name=building_name, row=row, column=column, from_day=previous["day"], to_day=current["day"])
+	temperature_trend = [ { **temperatures, "date": getReadableDate(temperatures["day"]) } for temperatures in temperature_trend ]
+
+	with METRICS.span("eps3_stage_duration_seconds", stage="render_template"):
+		return render_template("part/historic_report.html", day_analysis=day_analysis, day_predictions_count=day_predictions_count, temperature_trend=temperature_trend, day_differences=day_differences)
+
+# Temperatures of a wall cell by day (min, mean, max)
+@app.route('/api/thermal-trend/<building_name>/<row>/<column>', methods=['GET'])
+def apiThermalTrend(building_name : str, row : str, column : str):
+	return jsonify(THERMAL_SERIES.cellTrend(FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(row), FileManagement.sanitizeFileName(column)))
 
 # Report page (report of a wall)
 @app.route('/report/<building_name>/<day_string>', methods=['GET'])
@@ -250,15 +813,73 @@ def report(building_name : str, day_string : str = "_"):
 	if day_string == "_":
 		day_string = analysis_dates[-1]["program"]
 
-	analysis = getCompleteAnalysis(building_name, day_string)
-		
-	return render_template(
-		"pages/report.html",
-  		building_name=building_name,
-		analysis_date=day_string,
-		analysis_dates=analysis_dates,
-		analysis=analysis
+	with METRICS.span("eps3_stage_duration_seconds", stage="complete_analysis"):
+		analysis = getCompleteAnalysis(building_name, day_string)
+	with METRICS.span("eps3_stage_duration_seconds", stage="mosaic"):
+		mosaic = getMosaic(building_name, day_string)
+
+	with METRICS.span("eps3_stage_duration_seconds", stage="render_template"):
+		return render_template(
+			"pages/report.html",
+			building_name=building_name,
+			analysis_date=day_string,
+			analysis_dates=analysis_dates,
+			analysis=analysis,
+			mosaic=mosaic
+		)
+
+# Stored image thumbnail (named after its content, so never changes)
+@app.route('/thumbnails/<path:thumbnail_path>', methods=['GET'])
+def thumbnail(thumbnail_path : str):
+
+	thumbnail_path = os.path.normpath(thumbnail_path)
+	if not thumbnail_path.startswith(STORAGE_FOLDER + os.sep) or not thumbnail_path.endswith(".webp") or not FileManagement.fileExists(thumbnail_path):
+		abort(404)
+
+	response = send_file(os.path.abspath(thumbnail_path), max_age=THUMBNAILS_MAX_AGE, etag=True, conditional=True)
+	response.cache_control.public    = True
+	response.cache_control.immutable = True
+	return response
+
+# Result image drawn on demand from the stored predictions (when the result images are not stored)
+@app.route('/render/<building_name>/<day_string>/<row>/<column>/<camera>', methods=['GET'])
+def rendered_result_image(building_name : str, day_string : str, row : str, column : str, camera : str):
+
+	analysis = getPartialAnalysis(building_name, day_string, row, column)
+	if analysis is None or camera not in [ "normal", "thermal" ]:
+		abort(404)
+
+	thumbnail = request.args.get("size") == "thumbnail"
+	content   = getRenderedResultImage(analysis, camera, thumbnail)
+	return send_file(io.BytesIO(content), mimetype="image/webp" if thumbnail else "image/png", max_age=RENDERED_IMAGES_MAX_AGE)
+
+# Temperature difference map of a wall cell between two days (red got hotter, blue got colder)
+@app.route('/thermal-difference/<building_name>/<row>/<column>/<from_day>/<to_day>', methods=['GET'])
+def thermal_difference(building_name : str, row : str, column : str, from_day : str, to_day : str):
+
+	difference = THERMAL_SERIES.cellDifference(
+		FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(row), FileManagement.sanitizeFileName(column),
+		FileManagement.sanitizeFileName(from_day), FileManagement.sanitizeFileName(to_day)
 	)
+	if difference is None:
+		abort(404)
+
+	buffer = io.BytesIO()
+	getTemperatureDifferenceImage(difference).save(buffer, "PNG", compress_level=1)
+	return send_file(io.BytesIO(buffer.getvalue()), mimetype="image/png", max_age=RENDERED_IMAGES_MAX_AGE)
+
+# Wall mosaic tile (level 0 is one wall cell per tile, x is the column and y the row)
+@app.route('/mosaic/<building_name>/<day_string>/<layer>/<int:level>/<int:x>/<int:y>', methods=['GET'])
+def mosaic_tile(building_name : str, day_string : str, layer : str, level : int, x : int, y : int):
+
+	if layer not in WallMosaic.LAYERS:
+		abort(404)
+
+	tile_path = WallMosaic(MOSAIC_FOLDER, FileManagement.sanitizeFileName(building_name), FileManagement.sanitizeFileName(day_string)).tilePath(layer, level, x, y)
+	if not FileManagement.fileExists(tile_path):
+		abort(404)
+
+	return send_file(os.path.abspath(tile_path), max_age=60)
 
 # Home page (company info + all reports links)
 @app.route('/', methods=['GET'])
@@ -267,9 +888,7 @@ def home():
 	reports = []
 
 	# For each buildings
-	main_directory = STORAGE_FOLDER
-	for (building_path, building_full_path) in FileManagement.subFolders(main_directory):
-		building_name = building_path
+	for building_name in REPORT_INDEX.buildings():
 
 		# Add an entry
 		reports.append({
@@ -282,23 +901,6 @@ def home():
 		reports=reports
 	)
 
-# Test structural defects AI
-@app.route('/test/structural_defects', methods=['GET'])
-def test_structural_defects_ai():
-
-	search_folder = "/Users/ewenbouquet/Downloads/initial"
-	insert_folder = "/Users/ewenbouquet/Downloads/result"
- 
-	FileManagement.createFoldersIfNotExists([search_folder, insert_folder])
-
-	for (file_name, file_full_path) in tqdm(FileManagement.subFiles(search_folder)):
-		img = Image.open(file_full_path)
-		init_img, result_img, result_arr = STRUCTURAL_ISSUES_DETECTOR.detectFromImage(img)
-		result_img.save(os.path.join(insert_folder, file_name))
-  
-	return "Done"
-  
-  
 ################################################################################################
 #####> LAUNCH SERVER
 ################################################################################################
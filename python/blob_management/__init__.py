@@ -0,0 +1,90 @@
+from python.file_management import FileManagement
+import threading
+import hashlib
+import sqlite3
+import os
+
+class BlobStore:
+
+    def __init__(self, blobs_folder: str, index_path: str):
+        # Files named after the SHA-256 of their content, shared by all the analyses referencing them
+        self.__folder     = blobs_folder
+        self.__lock       = threading.Lock()
+        self.__connection = sqlite3.connect(index_path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        with self.__lock, self.__connection:
+            self.__connection.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash          TEXT NOT NULL PRIMARY KEY,
+                    path          TEXT NOT NULL,
+                    size          INTEGER NOT NULL,
+                    references_nb INTEGER NOT NULL
+                )
+            """)
+        FileManagement.createFolderIfNotExists(blobs_folder)
+
+    def path(self, content_hash: str, extension: str):
+        return os.path.join(self.__folder, content_hash[:2], "{}.{}".format(content_hash, extension))
+
+    def owns(self, path: str):
+        return path is not None and os.path.normpath(path).startswith(os.path.normpath(self.__folder) + os.sep)
+
+    def put(self, content: bytes, extension: str):
+
+        # Adds a reference to the blob of this content (written the first time), returns its path
+        content_hash = hashlib.sha256(content).hexdigest()
+        blob_path    = self.path(content_hash, extension)
+
+        with self.__lock, self.__connection:
+            rows = self.__connection.execute("SELECT path FROM blobs WHERE hash = ?", (content_hash,)).fetchall()
+            if len(rows) != 0:
+                self.__connection.execute("UPDATE blobs SET references_nb = references_nb + 1 WHERE hash = ?", (content_hash,))
+                return rows[0][0]
+
+            # The file can already exist (written before an interruption), its name guarantees its content
+            if not FileManagement.fileExists(blob_path):
+                FileManagement.createFolderIfNotExists(os.path.dirname(blob_path))
+                temporary_path = blob_path + ".tmp"
+                with open(temporary_path, 'wb') as f:
+                    f.write(content)
+                os.replace(temporary_path, blob_path)
+
+            self.__connection.execute("INSERT INTO blobs (hash, path, size, references_nb) VALUES (?, ?, ?, 1)", (content_hash, blob_path, len(content)))
+
+        return blob_path
+
+    def release(self, path: str):
+
+        # Removes a reference to a blob, the file is deleted with its last reference
+        content_hash = os.path.splitext(os.path.basename(path))[0]
+        with self.__lock, self.__connection:
+            rows = self.__connection.execute("SELECT references_nb FROM blobs WHERE hash = ?", (content_hash,)).fetchall()
+            if len(rows) == 0:
+                return
+            if rows[0][0] > 1:
+                self.__connection.execute("UPDATE blobs SET references_nb = references_nb - 1 WHERE hash = ?", (content_hash,))
+                return
+            self.__connection.execute("DELETE FROM blobs WHERE hash = ?", (content_hash,))
+            FileManagement.deleteFile(path)
+
+    def clear(self):
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM blobs")
+            FileManagement.deleteFoldersRecursively(self.__folder)
+            FileManagement.createFolderIfNotExists(self.__folder)
+
+    def stats(self):
+
+        # Bytes on disk vs bytes that would be stored without deduplication
+        with self.__lock:
+            blobs_nb, references_nb, stored_bytes, referenced_bytes = self.__connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(references_nb), 0), COALESCE(SUM(size), 0), COALESCE(SUM(size * references_nb), 0) FROM blobs"
+            ).fetchone()
+
+        return {
+            "blobs_nb"        : blobs_nb,
+            "references_nb"   : references_nb,
+            "stored_bytes"    : stored_bytes,
+            "referenced_bytes": referenced_bytes,
+            "saved_bytes"     : referenced_bytes - stored_bytes
+        }
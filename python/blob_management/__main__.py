@@ -0,0 +1,61 @@
+from python.blob_management import BlobStore
+from python.index_management import ReportIndex
+from python.file_management import FileManagement
+import argparse
+import json
+import os
+
+# Move the images of an existing storage tree to the blob store (the result files then point at the blobs):
+#   python -m python.blob_management --storage static/storage --blobs static/blobs --blobs-index storage-blobs.sqlite3
+def migrateStorage(store: BlobStore, index: ReportIndex, storage_folder: str):
+
+    files_nb, files_bytes = 0, 0
+    for (_, building_full_path) in FileManagement.subFolders(storage_folder):
+        for (_, day_full_path) in FileManagement.subFolders(building_full_path):
+            for (_, row_full_path) in FileManagement.subFolders(day_full_path):
+                for (_, column_full_path) in FileManagement.subFolders(row_full_path):
+
+                    result_data_full_path = os.path.join(column_full_path, ReportIndex.RESULT_DATA_FILE_NAME)
+                    if not FileManagement.fileExists(result_data_full_path):
+                        continue
+                    with open(result_data_full_path, "r") as f:
+                        analysis = json.load(f)
+
+                    # Images still stored in the cell folder are moved to the blob store
+                    moved_paths = []
+                    for camera, images in analysis["images"].items():
+                        for kind, path in images.items():
+                            if path is None or store.owns(path) or not FileManagement.fileExists(path):
+                                continue
+                            with open(path, 'rb') as f:
+                                content = f.read()
+                            images[kind] = store.put(content, os.path.splitext(path)[1][1:])
+                            moved_paths.append(path)
+                            files_nb    += 1
+                            files_bytes += len(content)
+
+                    # The result file and the index are updated before the former files are deleted (an interruption loses no image, a running server clears its caches)
+                    if len(moved_paths) != 0:
+                        FileManagement.writeFileAtomically(result_data_full_path, json.dumps(analysis, indent=4))
+                        index.addAnalysis(analysis)
+                        FileManagement.deleteFiles(moved_paths)
+
+    return files_nb, files_bytes
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Move the stored images to the content-addressed blob store and report the bytes saved")
+    parser.add_argument("--storage", default="static/storage")
+    parser.add_argument("--blobs", default="static/blobs")
+    parser.add_argument("--blobs-index", default="storage-blobs.sqlite3")
+    parser.add_argument("--index", default="storage-index.sqlite3", help="report index updated with the moved images")
+    args = parser.parse_args()
+
+    store = BlobStore(args.blobs, args.blobs_index)
+    files_nb, files_bytes = migrateStorage(store, ReportIndex(args.index), args.storage)
+
+    stats = store.stats()
+    print(" > {} files moved ({:.1f} MiB)".format(files_nb, files_bytes / 2 ** 20))
+    print(" > {} blobs for {} references: {:.1f} MiB stored instead of {:.1f} MiB, {:.1f} MiB saved".format(
+        stats["blobs_nb"], stats["references_nb"], stats["stored_bytes"] / 2 ** 20, stats["referenced_bytes"] / 2 ** 20, stats["saved_bytes"] / 2 ** 20
+    ))
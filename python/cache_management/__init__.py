@@ -0,0 +1,113 @@
+from collections import OrderedDict
+import threading
+
+class LruCache:
+
+    def __init__(self, max_entries: int, max_size: int, source_version: callable = None):
+        # source_version(): version of the cached data source, the cache is cleared when it changes (written by another process)
+        self.__source_version = source_version
+        self.__version     = source_version() if source_version is not None else None
+        self.__max_entries = max_entries
+        self.__max_size    = max_size
+        self.__size        = 0
+        self.__entries     = OrderedDict()
+        self.__computing   = {}
+        self.__lock        = threading.Lock()
+        self.hits          = 0
+        self.misses        = 0
+        self.evictions     = 0
+
+    def __checkSourceVersion(self):
+        if self.__source_version is None:
+            return
+
+        version = self.__source_version()
+        with self.__lock:
+            if version != self.__version:
+                self.__version = version
+                self.__clear()
+
+    def get(self, key, default=None):
+        self.__checkSourceVersion()
+        with self.__lock:
+            if key not in self.__entries:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return self.__entries[key][0]
+
+    def put(self, key, value, size: int = 1):
+        with self.__lock:
+            self.__put(key, value, size)
+
+    def __put(self, key, value, size: int):
+        if key in self.__entries:
+            self.__size -= self.__entries.pop(key)[1]
+
+        # Values bigger than the whole cache are not kept
+        if size > self.__max_size:
+            return
+
+        self.__entries[key] = (value, size)
+        self.__size += size
+
+        # Evict the least recently used entries
+        while len(self.__entries) > self.__max_entries or self.__size > self.__max_size:
+            _, (_, evicted_size) = self.__entries.popitem(last=False)
+            self.__size -= evicted_size
+            self.evictions += 1
+
+    def getOrCompute(self, key, compute: callable, size: callable = lambda value: 1):
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        # The key generation is bumped by the invalidations: a value computed before an invalidation is returned but not kept
+        with self.__lock:
+            computing  = self.__computing.setdefault(key, [ 0, 0 ])
+            computing[1] += 1
+            generation = computing[0]
+
+        try:
+            value = compute()
+            value_size = size(value) if value is not None else None
+        finally:
+            with self.__lock:
+                computing[1] -= 1
+                if computing[1] == 0:
+                    del self.__computing[key]
+                if value is not None and computing[0] == generation:
+                    self.__put(key, value, value_size)
+
+        return value
+
+    def invalidate(self, key):
+        with self.__lock:
+            if key in self.__entries:
+                self.__size -= self.__entries.pop(key)[1]
+            if key in self.__computing:
+                self.__computing[key][0] += 1
+
+    def __clear(self):
+        self.__entries.clear()
+        self.__size = 0
+        for computing in self.__computing.values():
+            computing[0] += 1
+
+    def clear(self):
+        with self.__lock:
+            self.__clear()
+
+    def stats(self):
+        with self.__lock:
+            return {
+                "entries"    : len(self.__entries),
+                "size"       : self.__size,
+                "max_entries": self.__max_entries,
+                "max_size"   : self.__max_size,
+                "hits"       : self.hits,
+                "misses"     : self.misses,
+                "evictions"  : self.evictions
+            }
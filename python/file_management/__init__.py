@@ -57,6 +57,14 @@ class FileManagement:
         for file_full_path in file_full_paths:
             FileManagement.deleteFile(file_full_path) 
 
+    @staticmethod
+    def writeFileAtomically(file_full_path, content):
+        # Readers either see the previous file or the complete new one
+        temporary_file_full_path = file_full_path + ".tmp"
+        with open(temporary_file_full_path, 'w') as f:
+            f.write(content)
+        os.replace(temporary_file_full_path, file_full_path)
+
     @staticmethod
     def sanitizeFileName(string: str):
         # Remove non alpha numeric characters
@@ -1,29 +1,54 @@
-from PIL import Image
+from PIL import Image, ImageDraw
 from matplotlib import pyplot as plt
+import hashlib
 import cv2
 import numpy as np
+import io
+import os
 
 class Matrix:
     
-    def __init__(self, data: list, rows: int, cols: int):
-        self.__data = data
+    def __init__(self, data, rows: int, cols: int):
+        self.__data = Matrix.__toArray(data)
         self.__rows, self.__cols = rows, cols
         self.__avoidGarbage = []
+
+    @staticmethod
+    def __toArray(data):
+        # Compatibility shim: nested lists (or tuples of pixels) are converted once
+        if isinstance(data, np.ndarray):
+            return data
+        return np.asarray(data)
      
     @staticmethod
     def FromData(matrix):
-        return Matrix(matrix, len(matrix), len(matrix[0]))
+        array = Matrix.__toArray(matrix)
+        return Matrix(array, array.shape[0], array.shape[1])
+
+    @staticmethod
+    def FromArray(array: np.ndarray, copy: bool = False):
+        # Zero-copy by default: the matrix shares the memory of the array
+        if copy:
+            array = np.array(array)
+        return Matrix(array, array.shape[0], array.shape[1])
     
     @staticmethod
     def FromValue(rows, cols, value):
-        return Matrix([ [ value for c in range(cols) ] for r in range(rows) ], rows, cols)
+        value = np.asarray(value)
+        return Matrix(np.full((rows, cols) + value.shape, value), rows, cols)
         
     @staticmethod
     def FromPredicate(rows, cols, predicate: callable):
         return Matrix([ [ predicate((r,c)) for c in range(cols) ] for r in range(rows) ], rows, cols)
 
     def copy(self):
-        return Matrix.FromPredicate(self.__rows, self.__cols, lambda c: self.__data[c[0]][c[1]])
+        return Matrix(self.__data.copy(), self.__rows, self.__cols)
+
+    def view(self):
+        return Matrix(self.__data, self.__rows, self.__cols)
+
+    def array(self):
+        return self.__data
         
     def rows(self):
         return self.__rows
@@ -47,49 +72,59 @@ class Matrix:
         return None
     
     def get(self, coords):
-        return self.__data[coords[0]][coords[1]]
+        value = self.__data[coords[0], coords[1]]
+        if isinstance(value, np.ndarray):
+            return tuple(value.tolist())
+        return value.item()
     
     def set(self, coords, value):
-        self.__data[coords[0]][coords[1]] = value
+        self.__data[coords[0], coords[1]] = value
 
-    def apply(self, value_function: callable):
-        for r in range(self.__rows):
-            for c in range(self.__cols):
-                self.__data[r][c] = value_function((r,c)) 
+    def apply(self, value_function: callable, vectorized: bool = False):
 
-    def contains(self, value):
+        # Vectorized: the function maps the whole array to the new values
+        if vectorized:
+            self.__data[...] = value_function(self.__data)
+            return
 
         for r in range(self.__rows):
             for c in range(self.__cols):
-                if self.__data[r][c] == value:
-                    return True
+                self.__data[r, c] = value_function((r,c)) 
 
-        return False
+    def __equalsMask(self, value):
+        mask = self.__data == np.asarray(value)
+        if mask.ndim > 2:
+            mask = mask.all(axis=tuple(range(2, mask.ndim)))
+        return mask
+
+    def contains(self, value):
+        return bool(self.__equalsMask(value).any())
     
     def count(self, value):
-        
-        occurences = 0
-        
-        for r in range(self.__rows):
-            for c in range(self.__cols):
-                if self.__data[r][c] == value:
-                    occurences += 1
+        return int(self.__equalsMask(value).sum())
 
-        return occurences
+    def __predicateMask(self, predicate):
+        # A predicate can be a boolean mask (fast path) or a coords function
+        if predicate is None:
+            return np.ones((self.__rows, self.__cols), dtype=bool)
+        if isinstance(predicate, np.ndarray):
+            return predicate
+        return np.array([ [ bool(predicate((r, c))) for c in range(self.__cols) ] for r in range(self.__rows) ], dtype=bool).reshape(self.__rows, self.__cols)
 
-    def toCoordsList(self, predicate: callable = lambda c: True):
-        return [ (r, c) for r in range(self.__rows) for c in range(self.__cols) if predicate((r, c))]
+    def toCoordsList(self, predicate: callable = None):
+        all_r, all_c = np.nonzero(self.__predicateMask(predicate))
+        return list(zip(all_r.tolist(), all_c.tolist()))
 
-    def toValuesList(self, predicate: callable = lambda c: True):
-        return [ self.__data[r][c] for r in range(self.__rows) for c in range(self.__cols) if predicate((r, c))]
+    def toValuesList(self, predicate: callable = None):
+        return self.__data[self.__predicateMask(predicate)].tolist()
 
     def toMatrix(self):
-        return [ [ self.__data[r][c] for r in range(self.__rows) ] for c in range(self.__cols) ]
+        return np.swapaxes(self.__data, 0, 1).tolist()
 
     def print(self):
         print("[")
 
-        for row in self.__data:
+        for row in self.__data.tolist():
             print("  " + str(row))
 
         print("]")
@@ -116,9 +151,9 @@ class Matrix:
 
 class RgbImage:
     
-    def __init__(self, matrix: Matrix):
+    def __init__(self, matrix: Matrix, copy: bool = True):
         self.__rows, self.__cols = matrix.rows(), matrix.cols()
-        self.__rgb_image = matrix.copy()
+        self.__rgb_image = matrix.copy() if copy else matrix
 
     @staticmethod
     def fromPilImage(img : Image, size : tuple = None):
@@ -127,8 +162,9 @@ class RgbImage:
         if size is not None:
             new_img = new_img.resize(size)
             
-        matrix = Matrix.FromPredicate(new_img.size[1], new_img.size[0], lambda c: new_img.getpixel((c[1], c[0])))
-        return RgbImage(matrix)
+        # Writable copy (the PIL buffer is read-only, the matrix can be modified with set / apply)
+        matrix = Matrix.FromArray(np.array(new_img))
+        return RgbImage(matrix, copy=False)
 
     @staticmethod
     def FromFilePath(img_path: str, size : tuple = None):
@@ -136,23 +172,17 @@ class RgbImage:
         return RgbImage.fromPilImage(Image.open(img_path), size)
         
     @staticmethod
-    def FromPixelMatrix(matrix: Matrix):
+    def FromPixelMatrix(matrix: Matrix, copy: bool = True):
         
-        return RgbImage(matrix)    
+        return RgbImage(matrix, copy)    
       
     def matrix(self):
         return self.__rgb_image
 
     def toPilImage(self):
         
-        img = Image.new('RGB', [self.__rows, self.__cols], 255)
-        data = img.load()
-
-        for x in range(img.size[0]):
-            for y in range(img.size[1]):
-                data[x,y] = self.__rgb_image.get((x,y))
-
-        return img
+        # The matrix rows are the image columns (x)
+        return getPilImage(self.__rgb_image.array())
     
 class LabelizedCursor:
     def __init__(self, ax, label_function: callable):
@@ -167,36 +197,78 @@ class LabelizedCursor:
             self.txt.set_position((x, y))
             self.__ax.figure.canvas.draw_idle()
 
+class PaletteLookup:
+
+    __cache = {}
+
+    def __init__(self, color_palette: list):
+        self.__rgb          = np.array([ color_data["rgb"] for color_data in color_palette ], dtype=np.uint8)
+        self.__temperatures = np.array([ color_data["temperature"] for color_data in color_palette ])
+
+    @staticmethod
+    def FromPalette(color_palette: list):
+
+        # One lookup per distinct palette, shared by all the frames
+        key = tuple((tuple(color_data["rgb"]), color_data["temperature"]) for color_data in color_palette)
+        if key not in PaletteLookup.__cache:
+            PaletteLookup.__cache[key] = PaletteLookup(color_palette)
+
+        return PaletteLookup.__cache[key]
+
+    def rgb(self):
+        return self.__rgb
+
+    def temperatures(self):
+        return self.__temperatures
+
+    def closestIndexes(self, rgb_array: np.ndarray):
+
+        # Distances are only computed once per distinct color of the frame
+        rgb_array = rgb_array[..., :3].astype(np.int64)
+        packed = (rgb_array[..., 0] << 16) | (rgb_array[..., 1] << 8) | rgb_array[..., 2]
+        colors, inverse = np.unique(packed, return_inverse=True)
+        colors = np.stack([ (colors >> 16) & 255, (colors >> 8) & 255, colors & 255 ], axis=-1)
+
+        # Same weighted distance as ThermalImage.get_closest_color_from_rgb
+        diff = np.abs(self.__rgb.astype(np.int64)[None, :, :] - colors[:, None, :])
+        distances = 0.299*diff[..., 0] + 0.587*diff[..., 1] + 0.114*diff[..., 2]
+
+        # On ties the last palette entry wins, as in get_closest_color_from_rgb
+        last = len(self.__rgb) - 1
+        closest = last - np.argmin(distances[:, ::-1], axis=1)
+
+        return closest[inverse.reshape(packed.shape)]
+
 class ThermalImage:
     
-    def __init__(self, matrix: Matrix):
+    def __init__(self, matrix: Matrix, copy: bool = True):
             
         self.__rows, self.__cols = matrix.rows(), matrix.cols()
-        self.__thermal_image = matrix.copy()
+        self.__thermal_image = matrix.copy() if copy else matrix
         
     def matrix(self):
         return self.__thermal_image
     
     def getTemperatureInfo(self):
         
-        all_temperatures = self.__thermal_image.toValuesList()
-        temperature_average = sum(all_temperatures) / len(all_temperatures)
-        min_temperature     = min(all_temperatures)
-        max_temperature     = max(all_temperatures)
+        all_temperatures = self.__thermal_image.array()
+        temperature_average = float(all_temperatures.mean())
+        min_temperature     = all_temperatures.min().item()
+        max_temperature     = all_temperatures.max().item()
         return temperature_average, min_temperature, max_temperature
       
     def toRgbImage(self):
         
-        np_old_img  = np.array(self.__thermal_image.toMatrix())
+        np_old_img  = self.__thermal_image.array()
         np_new_arr  = np.zeros((self.__rows, self.__cols), dtype=np.uint8)
         np_new_img  = np.uint8(cv2.normalize(np_old_img, np_new_arr, 0, 255, cv2.NORM_MINMAX))
-        colored_img = cv2.applyColorMap(np_new_img, cv2.COLORMAP_MAGMA).tolist()
+        colored_img = cv2.applyColorMap(np_new_img, cv2.COLORMAP_MAGMA)
         
-        return RgbImage.FromPixelMatrix(Matrix.FromPredicate(len(colored_img[0]), len(colored_img), lambda c: tuple(colored_img[c[1]][c[0]])))
+        return RgbImage.FromPixelMatrix(Matrix.FromArray(colored_img), copy=False)
     
     def toRelativeThermalImage(self, offset: float):
           
-        return ThermalImage(Matrix.FromPredicate(self.__rows, self.__cols, lambda c: self.__thermal_image.get(c) - offset))
+        return ThermalImage(Matrix.FromArray(self.__thermal_image.array() - offset), copy=False)
     
     @staticmethod
     def get_closest_color_from_rgb(color_palette, rgb_triplet: tuple):
@@ -225,53 +297,115 @@ class ThermalImage:
     @staticmethod
     def FromRgbImage(rgb_image: RgbImage, color_palette : list):
         
-        matrix = rgb_image.matrix()
+        lookup  = PaletteLookup.FromPalette(color_palette)
+        indexes = lookup.closestIndexes(rgb_image.matrix().array())
         
         return (
-            RgbImage(Matrix.FromPredicate(matrix.rows(), matrix.cols(), lambda c: 
-                ThermalImage.get_closest_color_from_rgb(color_palette, matrix.get(c))["rgb"]    
-            )),
-            ThermalImage(Matrix.FromPredicate(matrix.rows(), matrix.cols(), lambda c: 
-                ThermalImage.get_closest_color_from_rgb(color_palette, matrix.get(c))["temperature"]    
-            ))
+            RgbImage(Matrix.FromArray(lookup.rgb()[indexes]), copy=False),
+            ThermalImage(Matrix.FromArray(lookup.temperatures()[indexes]), copy=False)
         )
 
     @staticmethod
     def FromThermalArray(thermal_array : Matrix):
         
-        thermal_image = ThermalImage(Matrix.FromPredicate(len(thermal_array), len(thermal_array[0]), lambda c: int(thermal_array[c[0]][c[1]])))
+        thermal_image = ThermalImage(Matrix.FromArray(np.asarray(thermal_array).astype(np.int32)), copy=False)
         
         return (
             thermal_image.toRgbImage(),
             thermal_image
         )
 
-class LeakMask:
-    
-    def __init__(self, mask_matrix: Matrix):
-            
-        self.__rows, self.__cols = mask_matrix.rows(), mask_matrix.cols()
-        self.__mask_matrix = mask_matrix.copy()
+class ConnectedComponents:
 
-    @staticmethod
-    def __getSmallestRectangle(data: list):
+    # Backward half of the 8 directions, the other half is covered by symmetry
+    directions = [ (0,-1), (-1,0), (-1,-1), (-1,1) ]
 
-        all_x = [ coord[0] for coord in data ]
-        all_y = [ coord[1] for coord in data ]
+    def __init__(self, coords: np.ndarray, labels: np.ndarray):
+        self.__coords = coords
+        self.__labels = labels
 
-        min_x, max_x = min(all_x), max(all_x)
-        min_y, max_y = min(all_y), max(all_y)
-        
-        return ((min_x, min_y), (max_x, max_y))
+    @staticmethod
+    def FromMask(mask: np.ndarray, reach: int = 1):
+
+        # Pixels are numbered in row-major order
+        rows, cols = mask.shape
+        coords  = np.argwhere(mask)
+        indexes = np.full(mask.shape, -1, dtype=np.int64)
+        indexes[coords[:, 0], coords[:, 1]] = np.arange(len(coords))
+
+        # Link each pixel to the closest aligned pixel within reach in each direction:
+        # farther aligned pixels are then also reached through the closest one
+        all_u, all_v = [], []
+        for o_x, o_y in ConnectedComponents.directions:
+            closest = np.full(len(coords), -1, dtype=np.int64)
+            for t in range(1, reach + 1):
+                x, y = coords[:, 0] + o_x * t, coords[:, 1] + o_y * t
+                inside = (0 <= x) & (x < rows) & (0 <= y) & (y < cols)
+                candidates = np.full(len(coords), -1, dtype=np.int64)
+                candidates[inside] = indexes[x[inside], y[inside]]
+                found = (closest == -1) & (candidates != -1)
+                closest[found] = candidates[found]
+            linked = closest != -1
+            all_u.append(np.nonzero(linked)[0])
+            all_v.append(closest[linked])
+
+        return ConnectedComponents(coords, ConnectedComponents.__label(len(coords), np.concatenate(all_u), np.concatenate(all_v)))
 
     @staticmethod
-    def __firstIndividualPixel(pixels_data):
+    def __label(size: int, u: np.ndarray, v: np.ndarray):
+
+        # Hook roots on the smallest label then compress paths until stable,
+        # every pixel ends up labelled with the first pixel of its group
+        labels = np.arange(size)
+        while True:
+            lu, lv = labels[u], labels[v]
+            linked = np.minimum(lu, lv)
+            hooked = labels.copy()
+            np.minimum.at(hooked, lu, linked)
+            np.minimum.at(hooked, lv, linked)
+            while True:
+                compressed = hooked[hooked]
+                if np.array_equal(compressed, hooked):
+                    break
+                hooked = compressed
+            if np.array_equal(hooked, labels):
+                return labels
+            labels = hooked
+
+    def count(self):
+        return len(np.unique(self.__labels))
+
+    def coords(self):
+        return self.__coords
+
+    def labels(self):
+        # Group index of each pixel, groups ordered by their first pixel
+        return np.unique(self.__labels, return_inverse=True)[1].reshape(-1)
+
+    def groups(self):
+        order = np.argsort(self.__labels, kind="stable")
+        bounds = np.nonzero(np.diff(self.__labels[order]))[0] + 1
+        return [ [ (int(x), int(y)) for x, y in self.__coords[group] ] for group in np.split(order, bounds) if len(group) ]
+
+    def boxes(self):
+        labels = self.labels()
+        count  = labels.max() + 1 if len(labels) else 0
+        mins   = np.full((count, 2), np.iinfo(np.int64).max)
+        maxs   = np.full((count, 2), -1)
+        np.minimum.at(mins, labels, self.__coords)
+        np.maximum.at(maxs, labels, self.__coords)
+        return [ ((int(min_x), int(min_y)), (int(max_x), int(max_y))) for (min_x, min_y), (max_x, max_y) in zip(mins, maxs) ]
 
-        for pixel, pixel_data in pixels_data.items():
-            if pixel_data["group"] is None:
-                return pixel_data["index"]
+class LeakMask:
 
-        return None
+    # Two leak pixels belong to the same leak when they are aligned (row, column
+    # or diagonal) and at most `reach` pixels away
+    reach = 9
+    
+    def __init__(self, mask_matrix: Matrix, copy: bool = True):
+            
+        self.__rows, self.__cols = mask_matrix.rows(), mask_matrix.cols()
+        self.__mask_matrix = mask_matrix.copy() if copy else mask_matrix
 
     @staticmethod
     def tuple2ToStr(t: tuple):
@@ -283,98 +417,57 @@ class LeakMask:
         return (int(v1), int(v2))
 
     @staticmethod
-    def __makeGroups(data: list, start_group_id):
-
-        pixels_nb_categ     = 0
-        pixels_nb_to_categ  = len(data)
-        pixels_data         = { LeakMask.tuple2ToStr(data[i]) : { "group": None, "index": i } for i in range(len(data)) }
+    def __analyseLeaks(mask: np.ndarray, relative_temperatures: np.ndarray, class_name: str, peak: callable):
 
-        group_id = start_group_id
+        components = ConnectedComponents.FromMask(mask, LeakMask.reach)
+        coords     = components.coords()
+        labels     = components.labels()
 
-        # while individual pixels
-        while pixels_nb_to_categ != pixels_nb_categ:
-                
-            # pick the first individual pixel
-            start_pos     = LeakMask.__firstIndividualPixel(pixels_data)
-            all_pos_to_check  = [ start_pos ]
+        # Per leak statistics, computed from the pixels of the mask
+        temperatures = relative_temperatures[coords[:, 0], coords[:, 1]].astype(np.float64)
+        areas        = np.bincount(labels)
+        means        = np.bincount(labels, weights=temperatures) / np.maximum(areas, 1)
+        peaks        = np.full(len(areas), -np.inf if peak is np.maximum else np.inf)
+        peak.at(peaks, labels, temperatures)
 
-            # while pixels to check
-            while len(all_pos_to_check) != 0:
+        results = []
+        for ((min_x, min_y), (max_x, max_y)), area, mean, peak_value in zip(components.boxes(), areas, means, peaks):
+            results.append({
+                "confidence": 100,
+                "class": class_name,
+                "box": {
+                    "xmin": float(min_x), "ymin": float(min_y),
+                    "xmax": float(max_x), "ymax": float(max_y),
+                },
+                "area": int(area),
+                "mean_relative_temperature": float(mean),
+                "peak_relative_temperature": float(peak_value)
+            })
 
-                # pick the pixel to check
-                pos_to_check    = all_pos_to_check.pop()
-                pixel_to_check  = data[pos_to_check]
-                str_to_check    = LeakMask.tuple2ToStr(pixel_to_check)
-                
-                # if individual pixel
-                if pixels_data[str_to_check]["group"] is None:
-                    
-                    # add group to individual pixel 
-                    pixels_data[str_to_check]["group"] = group_id
-                    pixels_nb_categ += 1
-
-                    # if pixels_nb_categ % 100 == 0:                
-                    #     print("> {}% ".format(int(pixels_nb_categ * 100 / pixels_nb_to_categ)), end="\r")
-
-                    # check neighboors
-                    x,y = pixel_to_check
-                    for t in [i for i in range(1, 10)]:
-                        for o_x, o_y in [ (0,1),(0,-1),(1,0),(-1,0),(1,1),(-1,-1),(1,-1),(-1,1) ]:
-
-                            # if pixel exists
-                            next_pixel_to_check = (x + o_x * t, y + o_y * t)                
-                            newt_str_to_check   = LeakMask.tuple2ToStr(next_pixel_to_check)
-                            if newt_str_to_check in pixels_data:
-                                
-                                # if not already added and individual
-                                next_pos_to_check = pixels_data[newt_str_to_check]["index"]                    
-                                
-                                if not(next_pos_to_check in all_pos_to_check) and pixels_data[newt_str_to_check]["group"] is None:
-
-                                    # check it
-                                    all_pos_to_check.append(next_pos_to_check)
-
-            # next group
-            group_id += 1
-
-        # print("> 100%", end="\r")
-
-        result = {}
-        for pixel_str, pixel_data in pixels_data.items():
-            if not pixel_data["group"] in result:
-                result[pixel_data["group"]] = []
-            result[pixel_data["group"]].append(LeakMask.tuple2FromStr(pixel_str))
-    
-        return result
+        return results
         
     @staticmethod
     def FromData(image_view: RgbImage, relative_thermal_image: ThermalImage, leak_offset: float):
         
         # Leak detection
-        matrix = relative_thermal_image.matrix()
-        too_hot_coords  = matrix.toCoordsList(lambda c: leak_offset <= matrix.get(c))
-        too_cold_coords = matrix.toCoordsList(lambda c: matrix.get(c) <= -leak_offset)
+        relative_temperatures = relative_thermal_image.matrix().array()
+        too_hot_mask  = leak_offset <= relative_temperatures
+        too_cold_mask = relative_temperatures <= -leak_offset
         
         # Leak analysis
-        too_hot_groups  = LeakMask.__makeGroups(too_hot_coords, 0)
-        id_limit = len(too_hot_groups)
-        too_cold_groups = LeakMask.__makeGroups(too_cold_coords, id_limit)
-        
-        results = []
-        for leak_group_id, leak_group_coords in list(too_hot_groups.items()) + list(too_cold_groups.items()):
-            (min_x, min_y), (max_x, max_y) = LeakMask.__getSmallestRectangle(leak_group_coords)
-            results.append({
-                "confidence": 100,
-                "class": "hot leak" if leak_group_id < id_limit else "cold leak",
-                "box": {
-                    "xmin": float(min_x), "ymin": float(min_y),
-                    "xmax": float(max_x), "ymax": float(max_y),
-                }
-            })
+        results = (
+            LeakMask.__analyseLeaks(too_hot_mask,  relative_temperatures, "hot leak",  np.maximum) +
+            LeakMask.__analyseLeaks(too_cold_mask, relative_temperatures, "cold leak", np.minimum)
+        )
+
+        # Leak overlay, hot leaks drawn over cold leaks
+        overlay = np.array(image_view.matrix().array()[..., :3], dtype=np.uint8)
+        overlay[too_cold_mask] = (0, 0, 255)
+        overlay[too_hot_mask]  = (255, 0, 0)
 
         return (
-            RgbImage.FromPixelMatrix(Matrix.FromPredicate(matrix.rows(), matrix.cols(), lambda c: (255, 0, 0) if c in too_hot_coords else ((0, 0, 255) if c in too_cold_coords else image_view.matrix().get(c)))),
-            LeakMask(Matrix.FromPredicate(matrix.rows(), matrix.cols(), lambda c: c in too_hot_coords or c in too_cold_coords)),
+            RgbImage.FromPixelMatrix(Matrix.FromArray(overlay), copy=False),
+            LeakMask(Matrix.FromArray(too_hot_mask | too_cold_mask), copy=False),
             results
         )
     
@@ -383,11 +476,107 @@ class LeakMask:
     
 def getPilImage(mat: list):
     
-    img = Image.new('RGB', [len(mat), len(mat[0])], 255)
-    data = img.load()
+    # mat is indexed [x][y], PIL arrays are indexed [y][x]
+    arr = np.asarray(mat, dtype=np.uint8)[..., :3]
+    return Image.fromarray(np.ascontiguousarray(np.swapaxes(arr, 0, 1)))
+
+def drawPredictions(img: Image, predictions: list, color: tuple = (255, 0, 0)):
+
+    # Result overlay drawn from the stored boxes, on a copy of the initial image
+    result = img.convert('RGB')
+    draw = ImageDraw.Draw(result)
+    for prediction in predictions:
+        box = prediction["box"]
+        draw.rectangle([ box["xmin"], box["ymin"], box["xmax"], box["ymax"] ], outline=color, width=2)
+        draw.text((box["xmin"] + 3, max(0, box["ymin"] - 12)), "{} {}%".format(prediction["class"], prediction["confidence"]), fill=color)
+
+    return result
+
+def getTemperatureDifferenceImage(difference: np.ndarray, scale: float = None):
+
+    # Blue where the wall got colder, red where it got hotter, white without change (indexed [x][y] like the thermal grids)
+    scale    = scale or max(float(np.abs(difference).max()), 1.0)
+    relative = np.clip(difference / scale, -1.0, 1.0)[..., np.newaxis]
+    white    = np.full(difference.shape + (3,), 255.0)
+    hot      = white - np.clip(relative, 0.0, 1.0) * np.array([ 0.0, 255.0, 255.0 ])
+    colored  = hot - np.clip(-relative, 0.0, 1.0) * np.array([ 255.0, 255.0, 0.0 ])
+    return getPilImage(np.rint(colored))
+
+def saveThumbnail(img: Image, folder: str, file_name: str, size: tuple = (200, 200)):
 
-    for x in range(img.size[0]):
-        for y in range(img.size[1]):
-            data[x,y] = tuple(mat[x][y])
+    # Downsized WebP copy, named after its content so it can be cached forever
+    thumbnail = img.convert('RGB')
+    thumbnail.thumbnail(size)
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, 'WEBP', quality=80)
+    content = buffer.getvalue()
 
-    return img
\ No newline at end of file
+    thumbnail_path = os.path.join(folder, "{}-thumbnail-{}.webp".format(file_name, hashlib.sha1(content).hexdigest()[:12]))
+    with open(thumbnail_path, 'wb') as f:
+        f.write(content)
+
+    return thumbnail_path
+
+class EncodingPolicy:
+
+    extensions = { "PNG": "png", "WEBP": "webp", "JPEG": "jpg", "NPY": "npz" }
+
+    def __init__(self, encoding_format: str = "PNG", **options):
+        # Pillow format (with its save options), or NPY for raw arrays (compressed .npz)
+        if encoding_format not in EncodingPolicy.extensions:
+            raise Exception("Unknown encoding format: {}".format(encoding_format))
+        self.__format  = encoding_format
+        self.__options = options
+
+    @staticmethod
+    def Png(compress_level: int = 1):
+        return EncodingPolicy("PNG", compress_level=compress_level)
+
+    @staticmethod
+    def LosslessWebp(method: int = 0):
+        return EncodingPolicy("WEBP", lossless=True, method=method)
+
+    @staticmethod
+    def Jpeg(quality: int = 90):
+        return EncodingPolicy("JPEG", quality=quality)
+
+    @staticmethod
+    def Npy():
+        return EncodingPolicy("NPY")
+
+    def format(self):
+        return self.__format
+
+    def extension(self):
+        return EncodingPolicy.extensions[self.__format]
+
+    def encode(self, content):
+
+        # Image (or array for NPY) to file content
+        buffer = io.BytesIO()
+        if self.__format == "NPY":
+            np.savez_compressed(buffer, data=np.asarray(content))
+        elif self.__format == "JPEG":
+            content.convert('RGB').save(buffer, self.__format, **self.__options)
+        else:
+            content.save(buffer, self.__format, **self.__options)
+
+        return buffer.getvalue()
+
+    def path(self, folder: str, file_name: str):
+        # The extension comes from the policy
+        return os.path.join(folder, "{}.{}".format(file_name, self.extension()))
+
+    def save(self, content, folder: str, file_name: str):
+
+        # Returns the path
+        path = self.path(folder, file_name)
+        with open(path, 'wb') as f:
+            f.write(self.encode(content))
+
+        return path
+
+    @staticmethod
+    def loadArray(path: str):
+        with np.load(path) as arrays:
+            return arrays["data"]
@@ -0,0 +1,169 @@
+from python.file_management import FileManagement
+import threading
+import sqlite3
+import json
+import os
+
+class ReportIndex:
+
+    RESULT_DATA_FILE_NAME = "result-data.json"
+
+    def __init__(self, index_path: str):
+        self.__lock       = threading.Lock()
+        self.__connection = sqlite3.connect(index_path, check_same_thread=False)
+        self.__connection.execute("PRAGMA journal_mode=WAL")
+        self.__createTables()
+
+    def __createTables(self):
+        with self.__lock, self.__connection:
+            self.__connection.executescript("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    building_name TEXT NOT NULL,
+                    day           TEXT NOT NULL,
+                    row           TEXT NOT NULL,
+                    column        TEXT NOT NULL,
+                    time          TEXT,
+                    data          TEXT NOT NULL,
+                    PRIMARY KEY (building_name, day, row, column)
+                );
+                CREATE INDEX IF NOT EXISTS analyses_cell ON analyses (building_name, row, column);
+                CREATE TABLE IF NOT EXISTS day_summaries (
+                    building_name TEXT NOT NULL,
+                    day           TEXT NOT NULL,
+                    data          TEXT NOT NULL,
+                    PRIMARY KEY (building_name, day)
+                );
+                CREATE TABLE IF NOT EXISTS building_summaries (
+                    building_name TEXT NOT NULL PRIMARY KEY,
+                    data          TEXT NOT NULL
+                );
+            """)
+
+    @staticmethod
+    def __key(analysis: dict):
+        metadata = analysis["metadata"]
+        return (metadata["building_name"], metadata["day"], metadata["row"], metadata["column"])
+
+    def __loadSummary(self, table: str, key: tuple):
+        where = " AND ".join([ "building_name = ?", "day = ?" ][:len(key)])
+        rows = self.__connection.execute("SELECT data FROM {} WHERE {}".format(table, where), key).fetchall()
+        return json.loads(rows[0][0]) if len(rows) != 0 else None
+
+    def __saveSummary(self, table: str, key: tuple, summary: dict):
+        self.__connection.execute("INSERT OR REPLACE INTO {} VALUES ({}?)".format(table, "?, " * len(key)), key + (json.dumps(summary),))
+
+    @staticmethod
+    def __addCounts(counts: dict, added: dict, sign: int = 1):
+        for class_name, count in added.items():
+            counts[class_name] = counts.get(class_name, 0) + sign * count
+            if counts[class_name] == 0:
+                del counts[class_name]
+
+    def __updateSummaries(self, analysis: dict, previous_analysis: dict):
+
+        building_name, day, row, column = ReportIndex.__key(analysis)
+
+        # Building / day summary: issues count and wall grid
+        day_summary = self.__loadSummary("day_summaries", (building_name, day)) or {
+            "building_name"   : building_name,
+            "day"             : day,
+            "max_row"         : 0,
+            "max_column"      : 0,
+            "class_name_count": {},
+            "cells"           : {}
+        }
+        if previous_analysis is not None:
+            ReportIndex.__addCounts(day_summary["class_name_count"], previous_analysis["issues_nb"], -1)
+        ReportIndex.__addCounts(day_summary["class_name_count"], analysis["issues_nb"])
+        day_summary["max_row"]    = max(day_summary["max_row"], int(row))
+        day_summary["max_column"] = max(day_summary["max_column"], int(column))
+        day_summary["cells"]["{}_{}".format(row, column)] = {
+            "row"                        : row,
+            "column"                     : column,
+            "normal_initial_image_path"  : analysis["images"]["normal"]["initial"],
+            "normal_result_image_path"   : analysis["images"]["normal"]["result"],
+            "thermal_initial_image_path" : analysis["images"]["thermal"]["initial"],
+            "thermal_result_image_path"  : analysis["images"]["thermal"]["result"],
+        }
+        self.__saveSummary("day_summaries", (building_name, day), day_summary)
+
+        # Building summary: analysis days
+        building_summary = self.__loadSummary("building_summaries", (building_name,)) or {
+            "building_name": building_name,
+            "days"         : []
+        }
+        building_summary["days"] = sorted(set(building_summary["days"]) | { day })
+        self.__saveSummary("building_summaries", (building_name,), building_summary)
+
+    def __insert(self, analysis: dict):
+        key = ReportIndex.__key(analysis)
+        previous_rows = self.__connection.execute("SELECT data FROM analyses WHERE building_name = ? AND day = ? AND row = ? AND column = ?", key).fetchall()
+        self.__updateSummaries(analysis, json.loads(previous_rows[0][0]) if len(previous_rows) != 0 else None)
+        self.__connection.execute("INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?)", key + (analysis["metadata"].get("time"), json.dumps(analysis)))
+
+    def __select(self, query: str, parameters: tuple = ()):
+        with self.__lock:
+            return self.__connection.execute(query, parameters).fetchall()
+
+    def addAnalysis(self, analysis: dict):
+        with self.__lock, self.__connection:
+            self.__insert(analysis)
+
+    def __deleteAll(self):
+        for table in [ "analyses", "day_summaries", "building_summaries" ]:
+            self.__connection.execute("DELETE FROM {}".format(table))
+
+    def clear(self):
+        with self.__lock, self.__connection:
+            self.__deleteAll()
+
+    def rebuild(self, storage_folder: str):
+
+        # Reindex every result file of the storage tree (building / day / row / column)
+        analyses = []
+        for (_, building_full_path) in FileManagement.subFolders(storage_folder):
+            for (_, day_full_path) in FileManagement.subFolders(building_full_path):
+                for (_, row_full_path) in FileManagement.subFolders(day_full_path):
+                    for (_, column_full_path) in FileManagement.subFolders(row_full_path):
+                        result_data_full_path = os.path.join(column_full_path, ReportIndex.RESULT_DATA_FILE_NAME)
+                        if FileManagement.fileExists(result_data_full_path):
+                            with open(result_data_full_path, "r") as f:
+                                analyses.append(json.load(f))
+
+        with self.__lock, self.__connection:
+            self.__deleteAll()
+            for analysis in analyses:
+                self.__insert(analysis)
+
+        return len(analyses)
+
+    def dataVersion(self):
+        # Changes when another connection (the command line tools) commits to the index
+        with self.__lock:
+            return self.__connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def buildings(self):
+        return [ building_name for (building_name,) in self.__select("SELECT building_name FROM building_summaries ORDER BY building_name") ]
+
+    def days(self, building_name: str):
+        building_summary = self.buildingSummary(building_name)
+        return building_summary["days"] if building_summary is not None else []
+
+    def daySummary(self, building_name: str, day: str):
+        with self.__lock:
+            return self.__loadSummary("day_summaries", (building_name, day))
+
+    def buildingSummary(self, building_name: str):
+        with self.__lock:
+            return self.__loadSummary("building_summaries", (building_name,))
+
+    def analysis(self, building_name: str, day: str, row: str, column: str):
+        rows = self.__select("SELECT data FROM analyses WHERE building_name = ? AND day = ? AND row = ? AND column = ?", (building_name, day, row, column))
+        return json.loads(rows[0][0]) if len(rows) != 0 else None
+
+    def analyses(self, building_name: str, day: str):
+        # Same order as the storage folders (names sorted as strings)
+        return [ json.loads(data) for (data,) in self.__select("SELECT data FROM analyses WHERE building_name = ? AND day = ? ORDER BY row, column", (building_name, day)) ]
+
+    def cellHistory(self, building_name: str, row: str, column: str):
+        return [ (day, json.loads(data)) for (day, data) in self.__select("SELECT day, data FROM analyses WHERE building_name = ? AND row = ? AND column = ? ORDER BY day", (building_name, row, column)) ]
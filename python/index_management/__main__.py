@@ -0,0 +1,16 @@
+from python.index_management import ReportIndex
+import argparse
+import time
+
+# Rebuild the report index from an existing storage tree:
+#   python -m python.index_management --storage static/storage --index storage-index.sqlite3
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Rebuild the report index from a storage folder")
+    parser.add_argument("--storage", default="static/storage")
+    parser.add_argument("--index", default="storage-index.sqlite3")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    analyses_nb = ReportIndex(args.index).rebuild(args.storage)
+    print(" > {} analyses indexed in {:.2f}s".format(analyses_nb, time.perf_counter() - start))
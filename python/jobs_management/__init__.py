@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import queue
+import uuid
+
+class JobQueueFullException(Exception):
+    pass
+
+class JobTooLargeException(Exception):
+    pass
+
+class Job:
+
+    def __init__(self, building_name: str, cells: list):
+        self.id            = uuid.uuid4().hex
+        self.building_name = building_name
+        self.status        = "queued"
+        self.error         = None
+        self.day           = None
+        self.created_at    = datetime.now()
+        self.finished_at   = None
+        self.cells         = [
+            { "row": str(cell["row"]), "column": str(cell["col"]), "status": "queued", "error": None }
+            for cell in cells
+        ]
+
+    def cellDone(self, index: int, analysis: dict):
+        self.cells[index]["status"] = "done"
+        self.day = analysis["metadata"]["day"]
+
+    def cellFailed(self, index: int, error: Exception):
+        self.cells[index]["status"] = "failed"
+        self.cells[index]["error"]  = str(error)
+
+    def isFinished(self):
+        return self.status in [ "done", "failed" ]
+
+    def progress(self):
+        return sum(1 for cell in self.cells if cell["status"] != "queued") / max(len(self.cells), 1)
+
+    def toJson(self):
+        return {
+            "id"           : self.id,
+            "building_name": self.building_name,
+            "status"       : self.status,
+            "error"        : self.error,
+            "day"          : self.day,
+            "progress"     : self.progress(),
+            "created_at"   : self.created_at.isoformat(),
+            "finished_at"  : self.finished_at.isoformat() if self.finished_at is not None else None,
+            "cells"        : self.cells
+        }
+
+class JobQueue:
+
+    def __init__(self, process_job: callable, workers_nb: int = 1, max_pending_cells: int = 256, max_finished_jobs: int = 1000):
+        self.__process_job       = process_job
+        self.__max_pending_cells = max_pending_cells
+        self.__max_finished_jobs = max_finished_jobs
+        self.__pending_cells     = 0
+        self.__jobs              = OrderedDict()
+        self.__lock              = threading.Lock()
+        self.__queue             = queue.Queue()
+        self.__workers           = [ threading.Thread(target=self.__work, daemon=True) for _ in range(workers_nb) ]
+
+        for worker in self.__workers:
+            worker.start()
+
+    def submit(self, building_name: str, cells: list):
+
+        # A job larger than the queue could never be accepted (retrying does not help)
+        if len(cells) > self.__max_pending_cells:
+            raise JobTooLargeException("Too many cells in the job ({}, limit {})".format(len(cells), self.__max_pending_cells))
+
+        with self.__lock:
+
+            # Backpressure: refuse the job rather than buffering unbounded uploads
+            if self.__pending_cells + len(cells) > self.__max_pending_cells:
+                raise JobQueueFullException("Too many pending cells ({} queued, limit {})".format(self.__pending_cells, self.__max_pending_cells))
+
+            job = Job(building_name, cells)
+            self.__pending_cells += len(cells)
+            self.__jobs[job.id] = job
+            self.__forgetFinishedJobs()
+
+        self.__queue.put((job, cells))
+        return job
+
+    def get(self, job_id: str):
+        with self.__lock:
+            return self.__jobs.get(job_id)
+
+    def pendingCells(self):
+        return self.__pending_cells
+
+    def __forgetFinishedJobs(self):
+        finished = [ job_id for job_id, job in self.__jobs.items() if job.isFinished() ]
+        for job_id in finished[:max(0, len(finished) - self.__max_finished_jobs)]:
+            del self.__jobs[job_id]
+
+    def __work(self):
+
+        while True:
+            job, cells = self.__queue.get()
+            job.status = "running"
+
+            try:
+                self.__process_job(job, cells)
+                job.status = "failed" if any(cell["status"] == "failed" for cell in job.cells) else "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error  = str(e)
+            finally:
+                job.finished_at = datetime.now()
+                with self.__lock:
+                    self.__pending_cells -= len(cells)
+                del cells
+                self.__queue.task_done()
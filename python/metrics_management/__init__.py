@@ -0,0 +1,66 @@
+from contextlib import contextmanager
+import threading
+import bisect
+import time
+
+class Metrics:
+
+    # Default histogram buckets (seconds), from a millisecond to a minute
+    buckets = [ 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60 ]
+
+    def __init__(self, buckets: list = None):
+        self.__buckets    = sorted(buckets or Metrics.buckets)
+        self.__histograms = {}
+        self.__helps      = {}
+        self.__lock       = threading.Lock()
+
+    def register(self, name: str, help: str):
+        self.__helps[name] = help
+
+    def observe(self, name: str, value: float, **labels):
+
+        # Histogram series by labels: [ counts per bucket, sum, count ]
+        key = tuple(sorted((label, str(label_value)) for label, label_value in labels.items()))
+        with self.__lock:
+            series = self.__histograms.setdefault(name, {}).setdefault(key, [ [ 0 for _ in self.__buckets ], 0.0, 0 ])
+            index  = bisect.bisect_left(self.__buckets, value)
+            if index < len(self.__buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        # Time a block of code into the `name` histogram
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def toPrometheus(self):
+
+        # Prometheus text exposition format (cumulative buckets)
+        lines = []
+        with self.__lock:
+            for name, all_series in sorted(self.__histograms.items()):
+                if name in self.__helps:
+                    lines.append("# HELP {} {}".format(name, self.__helps[name]))
+                lines.append("# TYPE {} histogram".format(name))
+
+                for key, (counts, total, count) in sorted(all_series.items()):
+                    cumulative = 0
+                    for bucket, bucket_count in zip(self.__buckets, counts):
+                        cumulative += bucket_count
+                        lines.append("{}_bucket{} {}".format(name, Metrics.__labels(key + (("le", repr(float(bucket))),)), cumulative))
+                    lines.append("{}_bucket{} {}".format(name, Metrics.__labels(key + (("le", "+Inf"),)), count))
+                    lines.append("{}_sum{} {}".format(name, Metrics.__labels(key), repr(total)))
+                    lines.append("{}_count{} {}".format(name, Metrics.__labels(key), count))
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __labels(key: tuple):
+        if len(key) == 0:
+            return ""
+        return "{" + ",".join('{}="{}"'.format(label, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for label, value in key) + "}"
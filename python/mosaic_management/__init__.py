@@ -0,0 +1,85 @@
+from python.file_management import FileManagement
+from python.images_management import drawPredictions
+from PIL import Image
+import threading
+import math
+import os
+
+class WallMosaic:
+
+    # Level 0 has one wall cell per tile, each level above halves the resolution (2x2 tiles of the level below per tile)
+    TILE_SIZE       = 256
+    MAX_LEVEL       = 6
+    BACKGROUND      = (255, 255, 255)
+    TILE_EXTENSION  = ".jpg"
+    LAYERS          = [ "normal-initial", "normal-result", "thermal-initial", "thermal-result" ]
+
+    __locks = {}
+    __locks_lock = threading.Lock()
+
+    def __init__(self, mosaic_folder: str, building_name: str, day: str):
+        self.__folder = os.path.join(mosaic_folder, building_name, day)
+        self.__key    = (mosaic_folder, building_name, day)
+
+    def __lock(self):
+        # Cells of the same wall update the same upper tiles
+        with WallMosaic.__locks_lock:
+            return WallMosaic.__locks.setdefault(self.__key, threading.Lock())
+
+    def hasCell(self, row: int, column: int):
+        return all(FileManagement.fileExists(self.tilePath(layer, 0, column, row)) for layer in WallMosaic.LAYERS)
+
+    def tilePath(self, layer: str, level: int, x: int, y: int):
+        return os.path.join(self.__folder, layer, str(level), "{}_{}{}".format(x, y, WallMosaic.TILE_EXTENSION))
+
+    def __saveTile(self, tile: Image, layer: str, level: int, x: int, y: int):
+        tile_path = self.tilePath(layer, level, x, y)
+        FileManagement.createFolderIfNotExists(os.path.dirname(tile_path))
+        tile.save(tile_path, quality=85)
+
+    def __composeTile(self, layer: str, level: int, x: int, y: int):
+
+        # Rows go upwards: the children of the upper row are drawn at the top
+        half = WallMosaic.TILE_SIZE // 2
+        tile = Image.new("RGB", (WallMosaic.TILE_SIZE, WallMosaic.TILE_SIZE), WallMosaic.BACKGROUND)
+        for o_x in [0, 1]:
+            for o_y in [0, 1]:
+                child_path = self.tilePath(layer, level - 1, 2 * x + o_x, 2 * y + o_y)
+                if FileManagement.fileExists(child_path):
+                    with Image.open(child_path) as child:
+                        tile.paste(child.resize((half, half), Image.BILINEAR), (o_x * half, (1 - o_y) * half))
+
+        self.__saveTile(tile, layer, level, x, y)
+
+    def addCell(self, row: int, column: int, images: dict, predictions: dict = None):
+
+        # Only the tiles containing the cell are updated, one per level and layer
+        # predictions: layers drawn as boxes over the tile of another layer, { layer: (source layer, predictions) } (no full size overlay needed)
+        cell_tiles = {}
+        for layer, image in images.items():
+            cell_tiles[layer] = image.convert("RGB").resize((WallMosaic.TILE_SIZE, WallMosaic.TILE_SIZE), Image.BILINEAR)
+        for layer, (source_layer, layer_predictions) in (predictions or {}).items():
+            scale_x = WallMosaic.TILE_SIZE / images[source_layer].width
+            scale_y = WallMosaic.TILE_SIZE / images[source_layer].height
+            cell_tiles[layer] = drawPredictions(cell_tiles[source_layer], [
+                { **prediction, "box": { name: value * (scale_x if name[0] == "x" else scale_y) for name, value in prediction["box"].items() } }
+                for prediction in layer_predictions
+            ])
+
+        with self.__lock():
+            for layer, cell_tile in cell_tiles.items():
+                self.__saveTile(cell_tile, layer, 0, column, row)
+
+                x, y = column, row
+                for level in range(1, WallMosaic.MAX_LEVEL + 1):
+                    x, y = x // 2, y // 2
+                    self.__composeTile(layer, level, x, y)
+
+    @staticmethod
+    def overviewLevel(rows: int, columns: int, max_tiles: int = 2):
+        # Most detailed level showing the whole wall with at most max_tiles x max_tiles tiles
+        level = math.ceil(math.log2(max(rows, columns, 1) / max_tiles)) if max(rows, columns) > max_tiles else 0
+        return min(max(level, 0), WallMosaic.MAX_LEVEL)
+
+    def delete(self):
+        FileManagement.deleteFoldersRecursively(self.__folder)
@@ -0,0 +1,143 @@
+from python.file_management import FileManagement
+from datetime import datetime
+import threading
+import json
+import time
+import os
+
+class ReanalysisRunningException(Exception):
+    pass
+
+class ReanalysisCheckpoint:
+
+    # Append-only log: the settings of the run on the first line, then one reanalysed cell folder per line
+    def __init__(self, checkpoint_path: str, settings: dict):
+        self.__path     = checkpoint_path
+        self.__settings = json.dumps(settings, sort_keys=True)
+
+    def doneCells(self):
+
+        # Only the cells of a run with the same settings are resumed
+        if not FileManagement.fileExists(self.__path):
+            return set()
+
+        with open(self.__path, "r") as f:
+            lines = f.read().splitlines()
+        if len(lines) == 0 or lines[0] != self.__settings:
+            return set()
+
+        return set(lines[1:])
+
+    def start(self, restart: bool):
+        if restart or len(self.doneCells()) == 0:
+            with open(self.__path, "w") as f:
+                f.write(self.__settings + "\n")
+
+    def markDone(self, cell_folders: list):
+        with open(self.__path, "a") as f:
+            f.writelines(cell_folder + "\n" for cell_folder in cell_folders)
+            f.flush()
+            os.fsync(f.fileno())
+
+class Reanalysis:
+
+    RESULT_DATA_FILE_NAME = "result-data.json"
+
+    def __init__(self, reanalyse_batch: callable, checkpoint_path: str, batch_size: int = 16):
+        # reanalyse_batch(cell_folders) returns an error (or None) per cell folder and the cell folders whose thermal results were kept
+        self.__reanalyse_batch = reanalyse_batch
+        self.__checkpoint_path = checkpoint_path
+        self.__batch_size      = batch_size
+        self.__lock            = threading.Lock()
+        self.__thread          = None
+        self.__status          = { "status": "idle" }
+
+    @staticmethod
+    def findCells(storage_folder: str, building_names: list = None, days: list = None):
+
+        # Cell folders (building / day / row / column) having a result file, optionally restricted to some buildings and days
+        cell_folders = []
+        for (building_name, building_full_path) in FileManagement.subFolders(storage_folder):
+            if building_names is not None and building_name not in building_names:
+                continue
+            for (day, day_full_path) in FileManagement.subFolders(building_full_path):
+                if days is not None and day not in days:
+                    continue
+                for (_, row_full_path) in FileManagement.subFolders(day_full_path):
+                    for (_, column_full_path) in FileManagement.subFolders(row_full_path):
+                        if FileManagement.fileExists(os.path.join(column_full_path, Reanalysis.RESULT_DATA_FILE_NAME)):
+                            cell_folders.append(column_full_path)
+
+        return cell_folders
+
+    def run(self, cell_folders: list, settings: dict, restart: bool = False, show: bool = False):
+
+        # Cells already reanalysed with the same settings (of the detectors) are skipped (resume after an interruption)
+        checkpoint = ReanalysisCheckpoint(self.__checkpoint_path, settings)
+        checkpoint.start(restart)
+        done_cells = checkpoint.doneCells()
+        todo_cells = [ cell_folder for cell_folder in cell_folders if cell_folder not in done_cells ]
+
+        status = {
+            "status"            : "running",
+            "cells_nb"          : len(cell_folders),
+            "skipped_nb"        : len(cell_folders) - len(todo_cells),
+            "done_nb"           : 0,
+            "failed_nb"         : 0,
+            "thermal_skipped_nb": 0,
+            "thermal_skipped"   : [],
+            "errors"            : {},
+            "elapsed"           : 0.0,
+            "cells_per_second"  : 0.0,
+            "started_at"        : datetime.now().isoformat(),
+            "finished_at"       : None
+        }
+        self.__status = status
+
+        start = time.perf_counter()
+        for batch_start in range(0, len(todo_cells), self.__batch_size):
+            batch  = todo_cells[batch_start:batch_start + self.__batch_size]
+            errors, thermal_skipped = self.__reanalyse_batch(batch)
+
+            for cell_folder, error in zip(batch, errors):
+                if error is None:
+                    status["done_nb"] += 1
+                else:
+                    status["failed_nb"] += 1
+                    status["errors"][cell_folder] = str(error)
+            status["thermal_skipped"].extend(thermal_skipped)
+            status["thermal_skipped_nb"] = len(status["thermal_skipped"])
+            checkpoint.markDone([ cell_folder for cell_folder, error in zip(batch, errors) if error is None ])
+
+            status["elapsed"]          = time.perf_counter() - start
+            status["cells_per_second"] = (status["done_nb"] + status["failed_nb"]) / max(status["elapsed"], 1e-9)
+            if show:
+                print(" > {}/{} cells ({} failed, {} skipped), {:.2f} cells/s".format(
+                    status["done_nb"] + status["failed_nb"], len(todo_cells), status["failed_nb"], status["skipped_nb"], status["cells_per_second"]
+                ))
+
+        status["status"]      = "failed" if status["failed_nb"] != 0 else "done"
+        status["finished_at"] = datetime.now().isoformat()
+        return status
+
+    def start(self, cell_folders: list, settings: dict, restart: bool = False):
+
+        # Background run (one at a time), followed with status()
+        with self.__lock:
+            if self.isRunning():
+                raise ReanalysisRunningException("A reanalysis is already running")
+            self.__status = { "status": "queued" }
+            self.__thread = threading.Thread(target=self.__runSafely, args=(cell_folders, settings, restart), daemon=True)
+            self.__thread.start()
+
+    def isRunning(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def status(self):
+        return dict(self.__status)
+
+    def __runSafely(self, cell_folders: list, settings: dict, restart: bool):
+        try:
+            self.run(cell_folders, settings, restart)
+        except Exception as e:
+            self.__status = { **self.__status, "status": "failed", "error": str(e), "finished_at": datetime.now().isoformat() }
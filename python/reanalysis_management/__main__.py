@@ -0,0 +1,24 @@
+import argparse
+
+# Reanalyse the stored cells with the current detectors (resumed after an interruption unless --restart):
+#   python -m python.reanalysis_management --buildings Bjolsen --days 20221201
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Re-run the structural and thermal detectors on the stored wall cells")
+    parser.add_argument("--buildings", nargs="+", default=None)
+    parser.add_argument("--days", nargs="+", default=None)
+    parser.add_argument("--restart", action="store_true")
+    args = parser.parse_args()
+
+    # The server module holds the detectors, the process pool and the report index
+    import main
+
+    cell_folders = main.Reanalysis.findCells(main.STORAGE_FOLDER, args.buildings, args.days)
+    status = main.REANALYSIS.run(cell_folders, main.getReanalysisSettings(), args.restart, show=True)
+    print(" > {} cells reanalysed, {} failed, {} skipped in {:.2f}s ({:.2f} cells/s)".format(
+        status["done_nb"], status["failed_nb"], status["skipped_nb"], status["elapsed"], status["cells_per_second"]
+    ))
+    if status["thermal_skipped_nb"] != 0:
+        print(" > {} cells kept their thermal results (raw thermal grid not stored)".format(status["thermal_skipped_nb"]))
+    for cell_folder, error in status["errors"].items():
+        print("   - {}: {}".format(cell_folder, error))
@@ -0,0 +1,167 @@
+from python.file_management import FileManagement
+import numpy as np
+import threading
+import json
+import os
+
+class ThermalSeries:
+
+    # Frames of one building with the same shape and dtype: a raw (frames x H x W) file mapped in memory,
+    # and an append-only index giving the (day, row, column) of each frame
+    def __init__(self, frames_path: str, index_path: str, shape: tuple, dtype: np.dtype):
+        self.__frames_path = frames_path
+        self.__index_path  = index_path
+        self.__shape       = tuple(shape)
+        self.__dtype       = np.dtype(dtype)
+        self.__frame_bytes = int(np.prod(self.__shape)) * self.__dtype.itemsize
+        self.__cells       = {}
+        self.__frames_nb   = 0
+        self.__index_read  = 0
+        self.__mapping     = None
+        self.__readIndex()
+
+    def __readIndex(self):
+
+        # Only the lines appended since the last read are parsed
+        if not FileManagement.fileExists(self.__index_path):
+            return
+        with open(self.__index_path, "rb") as f:
+            f.seek(self.__index_read)
+            lines = f.read()
+        complete = lines[:lines.rfind(b"\n") + 1]
+        self.__index_read += len(complete)
+
+        for line in complete.decode().splitlines():
+            day, row, column = json.loads(line)
+            self.__cells.setdefault((row, column), []).append((day, self.__frames_nb))
+            self.__frames_nb += 1
+
+    def append(self, day: str, row: str, column: str, thermal_arr: np.ndarray):
+
+        # The frame is written before its index line: a frame without index line (interrupted append) is overwritten
+        with open(self.__frames_path, "ab") as f:
+            f.truncate(self.__frames_nb * self.__frame_bytes)
+            f.write(np.ascontiguousarray(thermal_arr, dtype=self.__dtype).tobytes())
+        with open(self.__index_path, "a") as f:
+            f.write(json.dumps([ day, row, column ]) + "\n")
+
+        self.__readIndex()
+
+    def __frames(self):
+
+        # Mapped again only when frames were appended since the last mapping
+        if self.__mapping is None or len(self.__mapping) != self.__frames_nb:
+            self.__mapping = np.memmap(self.__frames_path, dtype=self.__dtype, mode="r", shape=(self.__frames_nb,) + self.__shape)
+        return self.__mapping
+
+    def cellFrames(self, row: str, column: str):
+        # (day, frame) of a wall cell, the frame being a view of the mapped file
+        if (row, column) not in self.__cells:
+            return []
+        frames = self.__frames()
+        return [ (day, frames[index]) for (day, index) in self.__cells[(row, column)] ]
+
+class ThermalSeriesStore:
+
+    # One folder per building, one series per thermal grid shape and dtype
+    FRAMES_EXTENSION = ".frames"
+    INDEX_EXTENSION  = ".index"
+
+    def __init__(self, series_folder: str):
+        self.__folder = series_folder
+        self.__lock   = threading.Lock()
+        self.__series = {}
+        FileManagement.createFolderIfNotExists(series_folder)
+
+    @staticmethod
+    def compactDtype(thermal_arr: np.ndarray):
+        # Thermal grids are integer temperatures, stored on 16 bits when they fit
+        info = np.iinfo(np.int16)
+        return np.dtype(np.int16) if thermal_arr.size == 0 or (thermal_arr.min() >= info.min and thermal_arr.max() <= info.max) else np.dtype(np.int32)
+
+    def __buildingFolder(self, building_name: str):
+        return os.path.join(self.__folder, building_name)
+
+    def __getSeries(self, building_name: str, shape: tuple, dtype: np.dtype):
+        series_name = "{}-{}".format("x".join(str(size) for size in shape), dtype.name)
+        key         = (building_name, series_name)
+        if key not in self.__series:
+            base_path = os.path.join(self.__buildingFolder(building_name), series_name)
+            self.__series[key] = ThermalSeries(base_path + ThermalSeriesStore.FRAMES_EXTENSION, base_path + ThermalSeriesStore.INDEX_EXTENSION, shape, dtype)
+        return self.__series[key]
+
+    def __buildingSeries(self, building_name: str):
+
+        # Series of a building found on disk (a series is named "<H>x<W>-<dtype>")
+        building_folder = self.__buildingFolder(building_name)
+        if not FileManagement.folderExists(building_folder):
+            return []
+
+        series = []
+        for file_name in sorted(os.listdir(building_folder)):
+            if file_name.endswith(ThermalSeriesStore.INDEX_EXTENSION):
+                shape, dtype = file_name[:-len(ThermalSeriesStore.INDEX_EXTENSION)].split("-")
+                series.append(self.__getSeries(building_name, tuple(int(size) for size in shape.split("x")), np.dtype(dtype)))
+        return series
+
+    def append(self, building_name: str, day: str, row: str, column: str, thermal_arr: list):
+
+        # O(1): one frame written at the end of the series file
+        thermal_arr = np.asarray(thermal_arr).astype(np.int32)
+        with self.__lock:
+            FileManagement.createFolderIfNotExists(self.__buildingFolder(building_name))
+            self.__getSeries(building_name, thermal_arr.shape, ThermalSeriesStore.compactDtype(thermal_arr)).append(day, str(row), str(column), thermal_arr)
+
+    def cellHistory(self, building_name: str, row: str, column: str):
+
+        # Thermal grids of a wall cell by day (the last scan of a day), sorted by day
+        with self.__lock:
+            frames = { day: frame for series in self.__buildingSeries(building_name) for (day, frame) in series.cellFrames(str(row), str(column)) }
+        return sorted(frames.items())
+
+    def cellTrend(self, building_name: str, row: str, column: str):
+
+        # Temperature statistics of a wall cell by day
+        return [
+            {
+                "day" : day,
+                "min" : int(frame.min()),
+                "mean": float(frame.mean(dtype=np.float64)),
+                "max" : int(frame.max())
+            }
+            for (day, frame) in self.cellHistory(building_name, row, column)
+        ]
+
+    def cellDifference(self, building_name: str, row: str, column: str, from_day: str, to_day: str):
+
+        # Temperature difference of a wall cell between two days (None when a day is missing or the grids differ in shape)
+        history = dict(self.cellHistory(building_name, row, column))
+        if from_day not in history or to_day not in history or history[from_day].shape != history[to_day].shape:
+            return None
+        return history[to_day].astype(np.int32) - history[from_day].astype(np.int32)
+
+    def rebuild(self, storage_folder: str, load_array: callable, result_data_file_name: str = "result-data.json"):
+
+        # Series of the stored thermal grids (result files with an "arrays" entry), by day
+        self.clear()
+        frames_nb = 0
+        for (building_name, building_full_path) in FileManagement.subFolders(storage_folder):
+            for (day, day_full_path) in sorted(FileManagement.subFolders(building_full_path)):
+                for (row, row_full_path) in FileManagement.subFolders(day_full_path):
+                    for (column, column_full_path) in FileManagement.subFolders(row_full_path):
+                        result_data_path = os.path.join(column_full_path, result_data_file_name)
+                        if not FileManagement.fileExists(result_data_path):
+                            continue
+                        with open(result_data_path, "r") as f:
+                            analysis = json.load(f)
+                        if "arrays" in analysis:
+                            self.append(building_name, day, row, column, load_array(analysis["arrays"]["thermal"]))
+                            frames_nb += 1
+
+        return frames_nb
+
+    def clear(self):
+        with self.__lock:
+            self.__series = {}
+            FileManagement.deleteFoldersRecursively(self.__folder)
+            FileManagement.createFolderIfNotExists(self.__folder)
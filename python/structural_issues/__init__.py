@@ -1,39 +1,249 @@
-import torch 
 from PIL import Image
-from python.images_management import getPilImage
+from python.images_management import getPilImage, drawPredictions
+import numpy as np
+import threading
+import time
+import os
 
 class StructuralIssuesDetector:
 
-    def __init__(self, model_path: str):
-        self.__model  = torch.hub.load('ultralytics/yolov5', 'custom', path=model_path)
-        self.__model.conf = 0.4
+    # Inference backends: full precision PyTorch model, or INT8 quantized ONNX model (CPU)
+    backends = [ "pytorch", "int8" ]
+
+    def __init__(self, model_path: str, batch_size: int = 16, repo_path: str = None, lazy: bool = False, conf: float = 0.4, model = None,
+                 tile_size: int = None, tile_overlap: int = 128, tile_iou_threshold: float = 0.45, backend: str = "pytorch"):
+        # An already loaded model (yolov5 AutoShape interface) can be given instead of loading model_path
+        # With a tile size, frames are analyzed as overlapping tiles of tile_size pixels (small issues are not lost in the downsampling)
+        if backend not in StructuralIssuesDetector.backends:
+            raise Exception("Unknown structural issues backend: {}".format(backend))
+
+        self.__model_path       = model_path
+        self.__repo_path        = repo_path
+        self.__model            = model
+        self.__model_lock       = threading.Lock()
+        self.batch_size         = batch_size
+        self.conf               = conf
+        self.tile_size          = tile_size
+        self.tile_overlap       = tile_overlap
+        self.tile_iou_threshold = tile_iou_threshold
+        self.backend            = backend
+        self.loading_time       = None
+
+        if not lazy:
+            self.__getModel()
+
+    def __getModel(self):
+
+        with self.__model_lock:
+            if self.__model is None:
+
+                # torch and yolov5 are only imported when the model is really needed
+                start = time.perf_counter()
+                import torch
+
+                model_path = self.__model_path if self.backend == "pytorch" else StructuralIssuesDetector.QuantizedModelPath(self.__model_path)
+
+                # An export without --dynamic only accepts its own batch size
+                if self.backend == "int8":
+                    fixed_batch_size = StructuralIssuesDetector.OnnxBatchSize(model_path)
+                    if fixed_batch_size is not None and fixed_batch_size != self.batch_size:
+                        print(" > Structural issues ONNX model exported with a fixed batch size of {}, used instead of {} (export it with --dynamic)".format(fixed_batch_size, self.batch_size))
+                        self.batch_size = fixed_batch_size
+
+                if self.__repo_path is None:
+                    model = torch.hub.load('ultralytics/yolov5', 'custom', path=model_path)
+                else:
+                    # Offline: vendored yolov5 repository, the weights can be a .pt file or an exported .torchscript / .onnx artifact
+                    model = torch.hub.load(self.__repo_path, 'custom', path=model_path, source='local')
+                model.conf = self.conf
+
+                self.__model      = model
+                self.loading_time = time.perf_counter() - start
+                print(" > Structural issues model loaded in {:.2f}s ({})".format(self.loading_time, model_path))
+
+        return self.__model
+
+    @staticmethod
+    def QuantizedModelPath(model_path: str):
+
+        # INT8 model next to the weights, quantized from their ONNX export (weights-only dynamic quantization, no calibration data needed)
+        # The export must have a dynamic batch size (--dynamic), the detections are made by batches
+        root, _   = os.path.splitext(model_path)
+        onnx_path = root + ".onnx"
+        int8_path = root + ".int8.onnx"
+        export    = "python export.py --weights {} --include onnx --dynamic in the yolov5 repository".format(model_path)
+
+        if not os.path.isfile(onnx_path):
+            raise Exception("The INT8 backend needs an ONNX export of the weights ({}), e.g. {}".format(onnx_path, export))
+        if os.path.isfile(model_path) and os.path.getmtime(model_path) > os.path.getmtime(onnx_path):
+            raise Exception("The ONNX export ({}) is older than the weights ({}), export them again, e.g. {}".format(onnx_path, model_path, export))
+
+        # Quantized again when the export changed (retrained weights)
+        if not os.path.isfile(int8_path) or os.path.getmtime(onnx_path) > os.path.getmtime(int8_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+
+        return int8_path
+
+    @staticmethod
+    def OnnxBatchSize(onnx_path: str):
+
+        # Fixed batch size of an ONNX model input, None when it is dynamic
+        import onnx
+        dimension = onnx.load(onnx_path, load_external_data=False).graph.input[0].type.tensor_type.shape.dim[0]
+        return dimension.dim_value if dimension.HasField("dim_value") else None
+
+    def modelPath(self):
+        return self.__model_path
+
+    def isLoaded(self):
+        return self.__model is not None
+
+    def warmUp(self, background: bool = True):
+
+        # Load the model ahead of the first request
+        if not background:
+            self.__getModel()
+            return None
+
+        thread = threading.Thread(target=self.__warmUpSafely, daemon=True)
+        thread.start()
+        return thread
+
+    def __warmUpSafely(self):
+        # A failing background load is retried (and raised) by the first detection
+        try:
+            self.__getModel()
+        except Exception as e:
+            print(" > Structural issues model could not be loaded in the background: {}".format(e))
         
-    def detectFromArray(self, arr: list):
+    def detectFromArray(self, arr: list, render: bool = True):
         
         initial_img = getPilImage(arr)
-        return self.detectFromImage(initial_img)
+        return self.detectFromImage(initial_img, render)
 
-    def detectFromImage(self, initial_img : Image):
+    def detectFromArrays(self, arrs: list, render: bool = True):
+
+        return self.detectFromImages([ getPilImage(arr) for arr in arrs ], render)
+
+    def detectFromImage(self, initial_img : Image, render: bool = True):
+
+        return self.detectFromImages([ initial_img ], render)[0]
+
+    def detectFromImages(self, initial_imgs : list, render: bool = True):
+
+        # Run the model on chunks of at most batch_size images, results keep the input order
+        # Without render, the result image is None (the boxes can be drawn later from the predictions)
+        # The model is loaded first: its batch size can be fixed (ONNX export)
+        self.__getModel()
+        if self.tile_size is not None:
+            return self.__detectTiles(initial_imgs, render)
+
+        detections = []
+        for start in range(0, len(initial_imgs), self.batch_size):
+            detections += self.__detectBatch(initial_imgs[start:start + self.batch_size], render)
+
+        return detections
+
+    @staticmethod
+    def tileOrigins(size: tuple, tile_size: int, tile_overlap: int):
+
+        # Top left corners of the tiles covering a frame, the last tile of a row / column is aligned on the frame border
+        def axisOrigins(length):
+            if length <= tile_size:
+                return [ 0 ]
+            return list(range(0, length - tile_size, max(1, tile_size - tile_overlap))) + [ length - tile_size ]
+
+        width, height = size
+        return [ (x, y) for y in axisOrigins(height) for x in axisOrigins(width) ]
+
+    @staticmethod
+    def nonMaximumSuppression(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float):
+
+        # Indexes of the kept boxes (xmin, ymin, xmax, ymax), best scores first
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        order = np.argsort(-scores, kind="stable")
+        keep  = []
+        while order.size > 0:
+            best, others = order[0], order[1:]
+            keep.append(int(best))
+
+            inter_w = np.clip(np.minimum(boxes[best, 2], boxes[others, 2]) - np.maximum(boxes[best, 0], boxes[others, 0]), 0, None)
+            inter_h = np.clip(np.minimum(boxes[best, 3], boxes[others, 3]) - np.maximum(boxes[best, 1], boxes[others, 1]), 0, None)
+            inter   = inter_w * inter_h
+            iou     = inter / np.maximum(areas[best] + areas[others] - inter, 1e-9)
+            order   = others[iou <= iou_threshold]
+
+        return keep
+
+    def __detectTiles(self, initial_imgs : list, render: bool):
+
+        # Tiles of all the frames, with the frame they come from and their position in it
+        tiles, origins = [], []
+        for index, initial_img in enumerate(initial_imgs):
+            width, height = initial_img.size
+            for (x, y) in StructuralIssuesDetector.tileOrigins(initial_img.size, self.tile_size, self.tile_overlap):
+                tiles.append(initial_img.crop((x, y, min(x + self.tile_size, width), min(y + self.tile_size, height))))
+                origins.append((index, x, y))
+
+        # Tiles run in batches, their boxes are moved back to the frame coordinates
+        frame_boxes = [ [] for _ in initial_imgs ]
+        for start in range(0, len(tiles), self.batch_size):
+            all_results_data = self.__getModel()(tiles[start:start + self.batch_size]).pandas().xyxy
+            for results_data, (index, x, y) in zip(all_results_data, origins[start:start + self.batch_size]):
+                frame_boxes[index] += [
+                    (float(results_data.xmin[j]) + x, float(results_data.ymin[j]) + y, float(results_data.xmax[j]) + x, float(results_data.ymax[j]) + y, float(results_data.confidence[j]), str(results_data.name[j]))
+                    for j in range(results_data.shape[0])
+                ]
+
+        # Duplicates across the tile seams are merged (per class)
+        detections = []
+        for initial_img, boxes in zip(initial_imgs, frame_boxes):
+            result_predictions = []
+            for class_name in sorted(set(box[5] for box in boxes)):
+                class_boxes = [ box for box in boxes if box[5] == class_name ]
+                coords      = np.array([ box[:4] for box in class_boxes ])
+                scores      = np.array([ box[4] for box in class_boxes ])
+                for j in StructuralIssuesDetector.nonMaximumSuppression(coords, scores, self.tile_iou_threshold):
+                    xmin, ymin, xmax, ymax, confidence, _ = class_boxes[j]
+                    result_predictions.append({
+                        "confidence": round(confidence * 100),
+                        "class": class_name,
+                        "box": { "xmin": xmin, "ymin": ymin, "xmax": xmax, "ymax": ymax }
+                    })
+
+            result_image = drawPredictions(initial_img, result_predictions) if render else None
+            detections.append((initial_img, result_image, result_predictions))
+
+        return detections
+
+    def __detectBatch(self, initial_imgs : list, render: bool):
     	
         # Make prediction
-        results         = self.__model([initial_img])
-        results_data    = results.pandas().xyxy[0]
-        result_img_arr  = results.render()[0]
-        result_image    = Image.fromarray(result_img_arr)
-
-        # Json
-        result_predictions = [
-            {
-                "confidence": round(float(results_data.confidence[i]) * 100),
-                "class": str(results_data.name[i]),
-                "box": {
-                    "xmin": float(results_data.xmin[i]),
-                    "ymin": float(results_data.ymin[i]),
-                    "xmax": float(results_data.xmax[i]),
-                    "ymax": float(results_data.ymax[i]),
+        results          = self.__getModel()(initial_imgs)
+        all_results_data = results.pandas().xyxy
+        result_img_arrs  = results.render() if render else None
+
+        detections = []
+        for i, initial_img in enumerate(initial_imgs):
+            results_data    = all_results_data[i]
+            result_image    = Image.fromarray(result_img_arrs[i]) if render else None
+
+            # Json
+            result_predictions = [
+                {
+                    "confidence": round(float(results_data.confidence[j]) * 100),
+                    "class": str(results_data.name[j]),
+                    "box": {
+                        "xmin": float(results_data.xmin[j]),
+                        "ymin": float(results_data.ymin[j]),
+                        "xmax": float(results_data.xmax[j]),
+                        "ymax": float(results_data.ymax[j]),
+                    }
                 }
-            }
-            for i in range(results_data.shape[0])
-        ]
+                for j in range(results_data.shape[0])
+            ]
+
+            detections.append((initial_img, result_image, result_predictions))
 
-        return initial_img, result_image, result_predictions
\ No newline at end of file
+        return detections
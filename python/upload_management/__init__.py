@@ -0,0 +1,47 @@
+from PIL import Image
+import numpy as np
+import json
+import io
+
+class UploadDecoder:
+
+    NPY_MAGIC = b"\x93NUMPY"
+    NPZ_MAGIC = b"PK\x03\x04"
+
+    @staticmethod
+    def decodeArray(data: bytes, shape: list = None, dtype: str = None):
+
+        # NPY payload (np.save), the array is already in the upload layout
+        if data.startswith(UploadDecoder.NPY_MAGIC):
+            return np.load(io.BytesIO(data), allow_pickle=False)
+
+        # Compressed NPZ payload (np.savez_compressed), the first array is used
+        if data.startswith(UploadDecoder.NPZ_MAGIC):
+            with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+                return npz[npz.files[0]]
+
+        # Raw buffer described by its shape and dtype
+        if shape is not None:
+            return np.frombuffer(data, dtype=np.dtype(dtype or "uint8")).reshape(shape)
+
+        # Encoded image (PNG, 16 bits PNG for thermal data...), stored (height, width) so transposed to the (x, y) upload layout
+        array = np.asarray(Image.open(io.BytesIO(data)))
+        if array.ndim == 3:
+            array = array[..., :3]
+        return np.swapaxes(array, 0, 1)
+
+    @staticmethod
+    def FromMultipart(form: dict, files: dict):
+
+        # Same cells as the JSON upload, the arrays are read from the files named in the "images" field
+        building_name = form["building_name"]
+        images = []
+        for image_data in json.loads(form["images"]):
+            images.append({
+                "row"          : image_data["row"],
+                "col"          : image_data["col"],
+                "normal_array" : UploadDecoder.decodeArray(files[image_data["normal"]].read(), image_data.get("normal_shape"), image_data.get("normal_dtype")),
+                "thermal_array": UploadDecoder.decodeArray(files[image_data["thermal"]].read(), image_data.get("thermal_shape"), image_data.get("thermal_dtype"))
+            })
+
+        return building_name, images
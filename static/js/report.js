@@ -121,6 +121,28 @@ function generateHistoricIssueEvolutionData(metaId) {
     return {chartData, labels};
 }
 
+function generateHistoricTemperatureData(metaId) {
+
+    let jsonData  = JSON.parse($(`#${metaId}`).attr("content"));
+    let chartData = [];
+    let labels    = [ "min", "mean", "max" ];
+
+    for (let data of jsonData) {
+
+        const el = { ...data };
+
+        const day   = data.date.slice(0,2);
+        const month = data.date.slice(3,5);
+        const year  = data.date.slice(6,10);
+        el.date = new Date(year, month, day);
+        el.mean = Math.round(data.mean * 100) / 100;
+
+        chartData.push(el)
+    }
+
+    return {chartData, labels};
+}
+
 function generateHistoricIssueEvolutionGraph(metaId, chartData, labels) {
 
     var chart = am4core.create(metaId, am4charts.XYChart);
@@ -159,6 +181,56 @@ function generateHistoricIssueEvolutionGraph(metaId, chartData, labels) {
     chart.cursor = new am4charts.XYCursor();
 }
 
+// Camera shown in the report (normal or thermal), switched with the fixed button
+let normalCamera = true;
+
+// Wall mosaic (tiles of the wall, the rows go upwards)
+function renderMosaic(jqueryMosaic) {
+    const buildingName = jqueryMosaic.attr("building_name");
+    const day          = jqueryMosaic.attr("day");
+    const rows         = parseInt(jqueryMosaic.attr("rows"));
+    const columns      = parseInt(jqueryMosaic.attr("columns"));
+    const level        = parseInt(jqueryMosaic.attr("level"));
+    const scale        = 2 ** level;
+    const tileRows     = Math.ceil(rows / scale);
+    const tileColumns  = Math.ceil(columns / scale);
+    const tileSize     = 400 / Math.max(tileRows, tileColumns);
+
+    const table = $("<table>");
+    for (let y = tileRows - 1; y >= 0; y--) {
+        const tr = $("<tr>");
+        for (let x = 0; x < tileColumns; x++) {
+            const td = $("<td>");
+            for (const [layerAttr, cssClass, hidden] of [["normal_layer", "normal-image", !normalCamera], ["thermal_layer", "thermal-image", normalCamera]]) {
+                const layer = jqueryMosaic.attr(layerAttr);
+                $("<img>")
+                    .addClass(cssClass)
+                    .toggleClass("d-none", hidden)
+                    .attr("src", `/mosaic/${buildingName}/${day}/${layer}/${level}/${x}/${y}`)
+                    .attr("loading", "lazy")
+                    .attr("width", tileSize)
+                    .attr("height", tileSize)
+                    .on("error", function() { $(this).css("visibility", "hidden"); })
+                    .appendTo(td);
+            }
+            tr.append(td);
+        }
+        table.append(tr);
+    }
+
+    jqueryMosaic.empty().append(table);
+}
+
+function zoomMosaics(zoom) {
+    $(".wall-mosaic").each(function() {
+        const level = parseInt($(this).attr("level")) - zoom;
+        if (0 <= level && level <= parseInt($(this).attr("max_level"))) {
+            $(this).attr("level", level);
+            renderMosaic($(this));
+        }
+    });
+}
+
 // Modal
 function showModal(jqueryModal) {
     (new bootstrap.Modal(jqueryModal)) .show()
@@ -166,13 +238,18 @@ function showModal(jqueryModal) {
 
 $(document).ready(() => {
 
+    // Wall mosaic
+    $(".wall-mosaic").each(function() { renderMosaic($(this)); });
+    $(".wall-mosaic-zoom").on("click", function() {
+        zoomMosaics(parseInt($(this).attr("zoom")));
+    });
+
     // Time select 
     $("#report-date-select").on("change", function () {
         window.location = $(this).val();
     })
 
     // Switch camera fixed button
-    normalCamera = true;
     $("#switch-camera-fixed-btn").on("click", function() {
         normalCamera = !normalCamera;
         if (normalCamera) {
@@ -222,6 +299,11 @@ $(document).ready(() => {
                 let { chartData, labels } = generateHistoricIssueEvolutionData("historic-analysis-graph-data");
                 generateHistoricIssueEvolutionGraph("historic-analysis-graph", chartData, labels);
 
+                if ($("#historic-temperature-graph").length) {
+                    let temperatures = generateHistoricTemperatureData("historic-temperature-graph-data");
+                    generateHistoricIssueEvolutionGraph("historic-temperature-graph", temperatures.chartData, temperatures.labels);
+                }
+
                 showModal(modal);
             })
             .catch(console.error)